@@ -1,19 +1,37 @@
 import os
 import json
-import pystray
-from PIL import Image
-import tkinter as tk
-from tkinter import ttk, messagebox
 import psutil
 import time
 import threading
-import winreg
-from datetime import datetime
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import winreg
+except ImportError:  # non-Windows: registry discovery/startup registration unavailable
+    winreg = None
+from datetime import datetime, timedelta
 from pathlib import Path
 import logging
+import logging.handlers
+import queue
+import atexit
+import gzip
+import shutil
+import copy
+import bisect
 import sys
 import subprocess
+import signal
 import re
+import mmap
+import codecs
+import stat
+import select
+import struct
+import types
+import ctypes
+import ctypes.util
+from collections import OrderedDict, deque, namedtuple
 
 def _get_logger(maybe_logger=None):
     if maybe_logger is not None:
@@ -49,164 +67,2072 @@ def _is_incognito_allowed(ext_settings_obj):
         return True
     return False
 
+# Keys that identify an object as an extensions.settings entry (other sections,
+# e.g. updateclientdata.apps, are also keyed by extension ID)
+_EXTENSION_ID_PATTERN = re.compile(r'[a-p]{32}')
+_SETTINGS_ENTRY_KEYS = ('state', 'disable_reasons', 'path', 'location', 'manifest',
+                        'creation_flags', 'install_time', 'first_install_time', 'incognito')
+_AMBIGUOUS = object()
+
+def _load_extension_entries(prefs_path, extension_ids):
+    with open(prefs_path, 'r', encoding='utf-8') as f:
+        prefs = json.load(f)
+    settings = prefs.get('extensions', {}).get('settings', {})
+    return {ext_id: settings.get(ext_id) for ext_id in extension_ids}
+
+def _decode_json_object_at(buf, start, initial_window=64 * 1024):
+    """Decode the JSON value starting at buf[start], reading a growing window instead of the whole buffer."""
+    decoder = json.JSONDecoder()
+    size = len(buf)
+    window = initial_window
+    while True:
+        end = min(size, start + window)
+        try:
+            text = codecs.getincrementaldecoder('utf-8')().decode(buf[start:end], final=end >= size)
+            obj, _ = decoder.raw_decode(text)
+            return obj
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            if end >= size:
+                return None
+            window *= 4
+
+def _skip_json_whitespace(buf, pos, step):
+    size = len(buf)
+    while 0 <= pos < size and buf[pos] in b' \t\r\n':
+        pos += step
+    return pos
+
+def _object_value_offset(buf, key_start, key_end):
+    """Offset of the '{' opening the value of the quoted key at buf[key_start:key_end], or None if it is not an object key."""
+    before = _skip_json_whitespace(buf, key_start - 1, -1)
+    after = _skip_json_whitespace(buf, key_end, 1)
+    if before >= 0 and buf[before] in b'{,' and buf[after:after + 1] == b':':
+        value = _skip_json_whitespace(buf, after + 1, 1)
+        if buf[value:value + 1] == b'{':
+            return value
+    return None
+
+def _iter_object_key_offsets(buf, key_bytes):
+    """Yield the offset of the '{' opening each object value whose key is key_bytes."""
+    needle = b'"' + key_bytes + b'"'
+    pos = buf.find(needle)
+    while pos != -1:
+        value = _object_value_offset(buf, pos, pos + len(needle))
+        if value is not None:
+            yield value
+        pos = buf.find(needle, pos + len(needle))
+
+def _pick_settings_entry(buf, offsets):
+    found_object = False
+    candidates = []
+    for offset in offsets:
+        found_object = True
+        obj = _decode_json_object_at(buf, offset)
+        if obj is None:
+            return _AMBIGUOUS
+        if any(k in obj for k in _SETTINGS_ENTRY_KEYS):
+            candidates.append(obj)
+    if len(candidates) == 1:
+        return candidates[0]
+    if not found_object:
+        # ID is absent or only appears as a plain value (pinned list, MAC hash)
+        return None
+    return _AMBIGUOUS
+
+def _find_extension_entry(buf, extension_id):
+    return _pick_settings_entry(buf, _iter_object_key_offsets(buf, extension_id.encode('ascii')))
+
+_EXTENSION_KEY_PATTERN = re.compile(rb'"([a-p]{32})"')
+_PER_ID_FIND_MAX = 4
+
+def _find_extension_entries(buf, extension_ids):
+    """Locate every requested ID in one pass over buf; each value is _AMBIGUOUS, None or the entry."""
+    if len(extension_ids) <= _PER_ID_FIND_MAX:
+        # A few bytes.find scans beat one regex pass that stops at every quote
+        return {ext_id: _find_extension_entry(buf, ext_id) for ext_id in extension_ids}
+    wanted = {ext_id.encode('ascii'): ext_id for ext_id in extension_ids}
+    offsets = {ext_id: [] for ext_id in extension_ids}
+    for match in _EXTENSION_KEY_PATTERN.finditer(buf):
+        ext_id = wanted.get(match.group(1))
+        if ext_id is not None:
+            value = _object_value_offset(buf, match.start(), match.end())
+            if value is not None:
+                offsets[ext_id].append(value)
+    return {ext_id: _pick_settings_entry(buf, offsets[ext_id]) for ext_id in extension_ids}
+
+def extract_extension_entries(prefs_path, extension_ids):
+    """Return {extension_id: extensions.settings entry or None} from one read of a Preferences file.
+
+    All IDs are located in a single pass over the memory-mapped file and only the
+    object following each extension-ID key is decoded; if any match is ambiguous
+    the file is json.load()ed once and every ID is answered from that parse.
+    """
+    extension_ids = list(extension_ids)
+    results = None
+    with open(prefs_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                results = _find_extension_entries(buf, extension_ids)
+    if results is None or _AMBIGUOUS in results.values():
+        return _load_extension_entries(prefs_path, extension_ids)
+    return results
+
+def _stat_signature(st):
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+class PreferencesCache:
+    """LRU cache of extension entries extracted from Preferences files.
+
+    Entries are keyed by file path and only re-parsed when the file's
+    (mtime_ns, size, inode) signature changes.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_extension_entries(self, prefs_path, extension_ids, st=None):
+        """Return {extension_id: entry} for every requested ID, reading the file at most once."""
+        if st is None:
+            st = os.stat(prefs_path)
+        signature = _stat_signature(st)
+        with self._lock:
+            cached = self._entries.get(prefs_path)
+            known = cached[1] if cached is not None and cached[0] == signature else {}
+            missing = [ext_id for ext_id in extension_ids if ext_id not in known]
+            if not missing:
+                self._entries.move_to_end(prefs_path)
+                self.hits += 1
+                return {ext_id: known[ext_id] for ext_id in extension_ids}
+            self.misses += 1
+
+        extracted = extract_extension_entries(prefs_path, missing)
+        results = {ext_id: extracted[ext_id] if ext_id in extracted else known[ext_id]
+                   for ext_id in extension_ids}
+
+        # Only cache if the file did not change while we were reading it
+        if _stat_signature(os.stat(prefs_path)) != signature:
+            return results
+        with self._lock:
+            cached = self._entries.get(prefs_path)
+            entries = dict(cached[1]) if cached is not None and cached[0] == signature else {}
+            entries.update(results)
+            self._entries[prefs_path] = (signature, entries)
+            self._entries.move_to_end(prefs_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class ProfileRecord(namedtuple('ProfileRecord', 'name profile_dir prefs_path prefs_stat snapshot_version')):
+    """A browser profile with a Preferences file; prefs_stat is the os.stat result taken during enumeration."""
+    __slots__ = ()
+
+    @property
+    def is_snapshot(self):
+        return self.snapshot_version is not None
+
+class ExtensionState(namedtuple('ExtensionState', 'browser profile extension_id reason state disable_reasons '
+                                                  'incognito source_path signature')):
+    """Immutable verdict for one extension in one profile.
+
+    reason is one of the reason codes below; state, disable_reasons and incognito
+    (the effective private-window permission) are the Preferences values behind
+    it. signature is the (mtime_ns, size, inode) of source_path when it was read,
+    so two equal states describe the same file contents.
+    """
+    __slots__ = ()
+
+    ENABLED = 'enabled'
+    DISABLED = 'disabled'  # state == 0
+    DISABLE_REASONS = 'disable_reasons'  # disable_reasons set while state is not 0
+    INCOGNITO_REVOKED = 'incognito_revoked'
+    MISSING = 'missing'
+    LOCKED = 'locked'  # Preferences held open by the browser
+    UNREADABLE = 'unreadable'
+    BLOCKING_REASONS = frozenset((DISABLED, DISABLE_REASONS, INCOGNITO_REVOKED))
+    ERROR_REASONS = frozenset((LOCKED, UNREADABLE))
+
+    @classmethod
+    def from_entry(cls, browser, record, extension_id, ext_data):
+        """Classify an extensions.settings entry (None/empty when the extension is absent)."""
+        signature = _stat_signature(record.prefs_stat)
+        if not ext_data:
+            return cls(browser, record.name, extension_id, cls.MISSING, None, (), None, record.prefs_path, signature)
+        state = ext_data.get('state')
+        disable_reasons = ext_data.get('disable_reasons') or ()
+        if not isinstance(disable_reasons, (list, tuple)):
+            # Older Chromium builds store disable_reasons as a bit mask rather than a list
+            disable_reasons = (disable_reasons,)
+        disable_reasons = tuple(disable_reasons)
+        incognito = _is_incognito_allowed(ext_data)
+        if state == 0:
+            reason = cls.DISABLED
+        elif disable_reasons:
+            reason = cls.DISABLE_REASONS
+        elif not incognito:
+            reason = cls.INCOGNITO_REVOKED
+        else:
+            reason = cls.ENABLED
+        return cls(browser, record.name, extension_id, reason, state, disable_reasons, incognito,
+                   record.prefs_path, signature)
+
+    @classmethod
+    def from_error(cls, browser, record, extension_id, reason):
+        return cls(browser, record.name, extension_id, reason, None, (), None, record.prefs_path,
+                   _stat_signature(record.prefs_stat))
+
+    @property
+    def is_enabled(self):
+        return self.reason == self.ENABLED
+
+    @property
+    def is_blocking(self):
+        return self.reason in self.BLOCKING_REASONS
+
+    @property
+    def is_error(self):
+        return self.reason in self.ERROR_REASONS
+
+    def describe(self):
+        return f"{self.reason.replace('_', ' ')} in '{self.profile}'"
+
+def _profile_record(name, profile_dir, snapshot_version=None):
+    prefs_path = os.path.join(profile_dir, 'Preferences')
+    try:
+        st = os.stat(prefs_path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return ProfileRecord(name, profile_dir, prefs_path, st, snapshot_version)
+
+def _iter_subdirs(path):
+    try:
+        with os.scandir(path) as it:
+            entries = [e for e in it if e.is_dir()]
+    except OSError:
+        return []
+    return entries
+
+class LocalStateProfiles:
+    """Profile directory names from User Data/Local State (profile.info_cache), cached per file signature."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_profile_names(self, base_user_data_path):
+        """Return the profile directory names listed in Local State, or None if it cannot be used."""
+        local_state_path = os.path.join(base_user_data_path, 'Local State')
+        try:
+            signature = _stat_signature(os.stat(local_state_path))
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._entries.get(base_user_data_path)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        try:
+            with open(local_state_path, 'r', encoding='utf-8') as f:
+                info_cache = json.load(f)['profile']['info_cache']
+            names = sorted(info_cache)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not names:
+            return None
+
+        with self._lock:
+            self._entries[base_user_data_path] = (signature, names)
+        return names
+
+def _iter_snapshot_records(snapshots_root):
+    for ver in _iter_subdirs(snapshots_root):
+        for prof in _iter_subdirs(ver.path):
+            record = _profile_record(prof.name, prof.path, snapshot_version=ver.name)
+            if record is not None:
+                yield record
+
+def iter_profile_records(base_user_data_path, local_state=None):
+    """Yield a ProfileRecord for every profile under a User Data directory.
+
+    With a LocalStateProfiles the profile set comes from Local State; otherwise (or
+    if Local State is missing/unreadable) every subdirectory is probed. Snapshot
+    profiles (Edge/Brave keep them under User Data/Snapshots/<ver>/<profile>) are
+    included with snapshot_version set.
+    """
+    profile_names = local_state.get_profile_names(base_user_data_path) if local_state is not None else None
+    if profile_names is not None:
+        for name in profile_names:
+            record = _profile_record(name, os.path.join(base_user_data_path, name))
+            if record is not None:
+                yield record
+        yield from _iter_snapshot_records(os.path.join(base_user_data_path, 'Snapshots'))
+        return
+
+    for entry in _iter_subdirs(base_user_data_path):
+        if entry.name.lower() == 'snapshots':
+            yield from _iter_snapshot_records(entry.path)
+            continue
+        record = _profile_record(entry.name, entry.path)
+        if record is not None:
+            yield record
+
+# Files whose changes can alter the scan verdict for a User Data directory
+WATCHED_PROFILE_FILES = ('Preferences', 'Local State')
+
+def _is_watched_profile_file(rel_path):
+    """True for 'Local State' or '<profile>/Preferences' relative to a User Data root (nothing deeper)."""
+    parts = rel_path.replace('\\', '/').split('/')
+    return len(parts) <= 2 and parts[-1] in WATCHED_PROFILE_FILES
+
+class PreferencesChangeSource:
+    """Reports writes to Preferences/Local State under watched User Data directories.
+
+    wait(timeout) blocks until a WATCHED_PROFILE_FILES file changed (or the
+    timeout expires) and returns the set of changed file paths; writes to any
+    other file do not end the wait. An affected User Data root is returned
+    as-is when the backend lost track of individual files. interrupt() makes
+    the current or next wait() return immediately.
+    """
+
+    def watch(self, user_data_paths):
+        raise NotImplementedError
+
+    def interrupt(self):
+        raise NotImplementedError
+
+    def wait(self, timeout):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class PollingChangeSource(PreferencesChangeSource):
+    """Fallback backend: compares stat signatures of the watched files every poll_interval seconds."""
+
+    def __init__(self, poll_interval=1.0):
+        self.poll_interval = poll_interval
+        self._roots = set()
+        self._signatures = {}
+        self._interrupted = threading.Event()
+
+    def interrupt(self):
+        self._interrupted.set()
+
+    def watch(self, user_data_paths):
+        self._roots.update(p for p in user_data_paths if os.path.isdir(p))
+        self._signatures = self._snapshot()
+
+    def _snapshot(self):
+        signatures = {}
+        for base in self._roots:
+            local_state = os.path.join(base, 'Local State')
+            try:
+                signatures[local_state] = _stat_signature(os.stat(local_state))
+            except OSError:
+                pass
+            for record in iter_profile_records(base):
+                signatures[record.prefs_path] = _stat_signature(record.prefs_stat)
+        return signatures
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self._snapshot()
+            changed = {p for p in current.keys() | self._signatures.keys()
+                       if current.get(p) != self._signatures.get(p)}
+            self._signatures = current
+            if changed:
+                return changed
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            if self._interrupted.wait(min(self.poll_interval, remaining)):
+                self._interrupted.clear()
+                return set()
+
+class InotifyChangeSource(PreferencesChangeSource):
+    """Linux backend: inotify watches on each User Data root and its profile directories."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    IN_NONBLOCK = 0o4000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._wd_paths = {}
+        self._roots = set()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+
+    def interrupt(self):
+        try:
+            os.write(self._wake_w, b'x')
+        except (BlockingIOError, OSError):
+            pass  # Pipe already holds a pending wakeup (or is closed)
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd >= 0:
+            self._wd_paths[wd] = path
+
+    def watch(self, user_data_paths):
+        for base in user_data_paths:
+            if base in self._roots or not os.path.isdir(base):
+                continue
+            self._roots.add(base)
+            # The root sees Local State rewrites and newly created profile directories
+            self._add_watch(base)
+            for record in iter_profile_records(base):
+                if not record.is_snapshot:
+                    self._add_watch(record.profile_dir)
+
+    def wait(self, timeout):
+        if self._fd < 0:
+            raise OSError("inotify source is closed")
+        deadline = time.monotonic() + timeout
+        changed = set()
+        while True:
+            # Events for other files in a profile directory (History-journal, Cookies...) are
+            # read and dropped here instead of waking the caller
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [], max(0, deadline - time.monotonic()))
+            if not ready:
+                return changed
+            if self._fd in ready:
+                self._read_events(changed)
+            if self._wake_r in ready:
+                try:
+                    while os.read(self._wake_r, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                return changed
+            if changed:
+                return changed
+
+    def _read_events(self, changed):
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            self._parse_events(data, changed)
+
+    def _parse_events(self, data, changed):
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                changed.update(self._roots)
+                continue
+            path = self._wd_paths.get(wd)
+            if path is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self._wd_paths[wd]
+                continue
+            if mask & self.IN_ISDIR:
+                if path in self._roots:
+                    # New profile directory: watch it and treat the root as changed
+                    self._add_watch(os.path.join(path, name))
+                    changed.add(path)
+                continue
+            if name in WATCHED_PROFILE_FILES:
+                changed.add(os.path.join(path, name))
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._fd = -1
+
+class WindowsChangeSource(PreferencesChangeSource):
+    """Windows backend: overlapped ReadDirectoryChangesW on each User Data root (recursive)."""
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self):
+        import win32con
+        import win32event
+        import win32file
+        import pywintypes
+        self._win32con = win32con
+        self._win32event = win32event
+        self._win32file = win32file
+        self._pywintypes = pywintypes
+        self._watches = {}
+        self._wake_event = win32event.CreateEvent(None, True, False, None)
+
+    def interrupt(self):
+        self._win32event.SetEvent(self._wake_event)
+
+    def watch(self, user_data_paths):
+        win32con, win32file = self._win32con, self._win32file
+        for base in user_data_paths:
+            if base in self._watches or not os.path.isdir(base):
+                continue
+            handle = win32file.CreateFile(
+                base,
+                win32con.FILE_LIST_DIRECTORY,
+                win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+                None,
+                win32con.OPEN_EXISTING,
+                win32con.FILE_FLAG_BACKUP_SEMANTICS | win32con.FILE_FLAG_OVERLAPPED,
+                None,
+            )
+            overlapped = self._pywintypes.OVERLAPPED()
+            overlapped.hEvent = self._win32event.CreateEvent(None, True, False, None)
+            buf = win32file.AllocateReadBuffer(self.BUFFER_SIZE)
+            self._watches[base] = (handle, overlapped, buf)
+            self._arm(base)
+
+    def _arm(self, base):
+        handle, overlapped, buf = self._watches[base]
+        self._win32file.ReadDirectoryChangesW(
+            handle, buf, True,
+            self._win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+            | self._win32con.FILE_NOTIFY_CHANGE_DIR_NAME
+            | self._win32con.FILE_NOTIFY_CHANGE_LAST_WRITE,
+            overlapped,
+        )
+
+    def wait(self, timeout):
+        win32event = self._win32event
+        deadline = time.monotonic() + timeout
+        events = [self._wake_event] + [overlapped.hEvent for _, overlapped, _ in self._watches.values()]
+        changed = set()
+        while True:
+            # The watch is recursive, so cache writes deep inside User Data signal too;
+            # they are collected and dropped here instead of waking the caller
+            remaining_ms = max(0, int((deadline - time.monotonic()) * 1000))
+            rc = win32event.WaitForMultipleObjects(events, False, remaining_ms)
+            if rc == win32event.WAIT_TIMEOUT:
+                return changed
+            if rc == win32event.WAIT_OBJECT_0:
+                win32event.ResetEvent(self._wake_event)
+                return changed
+            self._collect_changes(changed)
+            if changed:
+                return changed
+
+    def _collect_changes(self, changed):
+        win32event = self._win32event
+        for base, (handle, overlapped, buf) in self._watches.items():
+            if win32event.WaitForSingleObject(overlapped.hEvent, 0) != win32event.WAIT_OBJECT_0:
+                continue
+            nbytes = self._win32file.GetOverlappedResult(handle, overlapped, True)
+            if nbytes == 0:
+                # Notification buffer overflowed - individual changes are lost
+                changed.add(base)
+            else:
+                for _action, rel_path in self._win32file.FILE_NOTIFY_INFORMATION(buf, nbytes):
+                    if _is_watched_profile_file(rel_path):
+                        changed.add(os.path.join(base, rel_path))
+            win32event.ResetEvent(overlapped.hEvent)
+            self._arm(base)
+
+    def close(self):
+        for handle, overlapped, _ in self._watches.values():
+            try:
+                self._win32file.CancelIo(handle)
+                handle.Close()
+                overlapped.hEvent.Close()
+            except self._pywintypes.error:
+                pass
+        self._watches.clear()
+        self._wake_event.Close()
+
+def create_change_source(logger=None):
+    """Return the best available PreferencesChangeSource for this platform."""
+    logger = _get_logger(logger)
+    try:
+        if sys.platform.startswith('linux'):
+            return InotifyChangeSource()
+        if os.name == 'nt':
+            return WindowsChangeSource()
+    except (OSError, ImportError, AttributeError) as e:
+        logger.warning(f"File change notifications unavailable ({e}); falling back to polling")
+    return PollingChangeSource()
+
+BrowserChannel = namedtuple('BrowserChannel', 'name windows_user_data linux_user_data')
+BrowserChannel.__doc__ = """One release channel's User Data directory: a %VAR%-style Windows path and a path
+relative to $XDG_CONFIG_HOME (~/.config) on Linux; either may be None."""
+
+BrowserSpec = namedtuple('BrowserSpec', 'label image linux_images install_dirs channels')
+BrowserSpec.__doc__ = """A supported browser: display label, Windows image name, Linux process names,
+install directories (relative to Program Files / LOCALAPPDATA) and channels in scan order."""
+
+BROWSER_CATALOG = (
+    BrowserSpec('Chrome', 'chrome.exe', ('chrome',),
+                (r'Google\Chrome\Application', r'CentBrowser\Application', r'Chromium\Application'), (
+        BrowserChannel('stable', r'%LOCALAPPDATA%\Google\Chrome\User Data', 'google-chrome'),
+        BrowserChannel('beta', r'%LOCALAPPDATA%\Google\Chrome Beta\User Data', 'google-chrome-beta'),
+        BrowserChannel('canary', r'%LOCALAPPDATA%\Google\Chrome SxS\User Data', None),
+        BrowserChannel('dev', None, 'google-chrome-unstable'),
+    )),
+    BrowserSpec('Edge', 'msedge.exe', ('msedge',), (r'Microsoft\Edge\Application',), (
+        BrowserChannel('stable', r'%LOCALAPPDATA%\Microsoft\Edge\User Data', 'microsoft-edge'),
+        BrowserChannel('beta', r'%LOCALAPPDATA%\Microsoft\Edge Beta\User Data', 'microsoft-edge-beta'),
+        BrowserChannel('dev', r'%LOCALAPPDATA%\Microsoft\Edge Dev\User Data', 'microsoft-edge-dev'),
+        BrowserChannel('canary', r'%LOCALAPPDATA%\Microsoft\Edge SxS\User Data', None),
+    )),
+    BrowserSpec('Brave', 'brave.exe', ('brave',), (r'BraveSoftware\Brave-Browser\Application',), (
+        BrowserChannel('stable', r'%LOCALAPPDATA%\BraveSoftware\Brave-Browser\User Data', 'BraveSoftware/Brave-Browser'),
+        BrowserChannel('beta', r'%LOCALAPPDATA%\BraveSoftware\Brave-Browser-Beta\User Data', 'BraveSoftware/Brave-Browser-Beta'),
+        BrowserChannel('dev', r'%LOCALAPPDATA%\BraveSoftware\Brave-Browser-Dev\User Data', 'BraveSoftware/Brave-Browser-Dev'),
+    )),
+    BrowserSpec('Comet', 'comet.exe', (), (r'Perplexity\Comet\Application',), (
+        BrowserChannel('stable', r'%LOCALAPPDATA%\Perplexity\Comet\User Data', None),
+        BrowserChannel('roaming', r'%APPDATA%\Perplexity\Comet\User Data', None),
+    )),
+)
+
+BROWSER_IMAGES = [spec.image for spec in BROWSER_CATALOG]
+
+def resolve_user_data_paths(catalog=BROWSER_CATALOG, windows=None, environ=None, home=None):
+    """Expand the catalog once into {image (lowercase): (User Data dir, ...)} for this platform.
+
+    Windows channels use their %VAR% paths (dropped if a variable is unset); elsewhere
+    the Linux paths are joined to $XDG_CONFIG_HOME or ~/.config. Linux process names
+    map to the same directories as the Windows image.
+    """
+    windows = (os.name == 'nt') if windows is None else windows
+    environ = os.environ if environ is None else environ
+    config_home = environ.get('XDG_CONFIG_HOME') or os.path.join(home or os.path.expanduser('~'), '.config')
+
+    def expand(path):
+        return re.sub(r'%([^%]+)%', lambda m: environ.get(m.group(1), m.group(0)), path)
+
+    table = {}
+    for spec in catalog:
+        paths = []
+        for channel in spec.channels:
+            if windows:
+                if channel.windows_user_data is None:
+                    continue
+                path = expand(channel.windows_user_data)
+                if '%' in path:
+                    continue
+            else:
+                if channel.linux_user_data is None:
+                    continue
+                path = os.path.join(config_home, *channel.linux_user_data.split('/'))
+            paths.append(path)
+        for image in (spec.image,) + tuple(spec.linux_images):
+            table[image.lower()] = tuple(paths)
+    return table
+
+_user_data_table = None
+
+def browser_user_data_table():
+    """The resolved image -> User Data paths table for this machine (computed on first use)."""
+    global _user_data_table
+    if _user_data_table is None:
+        _user_data_table = resolve_user_data_paths()
+    return _user_data_table
+
 def extract_exe_from_command(command):
     m = re.match(r'^\s*"?([^"\s]+?\.exe)"?', command.strip(), re.IGNORECASE)
     return m.group(1) if m else None
 
-def get_registered_browser_exes():
-    exe_paths = set()
-    roots = [
-        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Clients\StartMenuInternet"),
-        (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Clients\StartMenuInternet"),
-    ]
-    for hive, root in roots:
+def _start_menu_internet_keys():
+    return [
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Clients\StartMenuInternet"),
+        (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Clients\StartMenuInternet"),
+    ]
+
+def get_registry_signature():
+    """Last-write times of the StartMenuInternet keys; changes when a browser registers or unregisters."""
+    if winreg is None:
+        return None
+    signature = []
+    for hive, root in _start_menu_internet_keys():
+        try:
+            with winreg.OpenKey(hive, root) as key:
+                signature.append(winreg.QueryInfoKey(key)[2])
+        except OSError:
+            signature.append(None)
+    return signature
+
+def get_registered_browser_exes():
+    exe_paths = set()
+    if winreg is None:
+        return []
+    roots = _start_menu_internet_keys()
+    for hive, root in roots:
+        try:
+            with winreg.OpenKey(hive, root) as key:
+                idx = 0
+                while True:
+                    try:
+                        sub_name = winreg.EnumKey(key, idx)
+                        idx += 1
+                    except OSError:
+                        break
+                    try:
+                        cmd_key_path = root + f"\\{sub_name}\\shell\\open\\command"
+                        with winreg.OpenKey(hive, cmd_key_path) as cmd_key:
+                            cmd, _ = winreg.QueryValueEx(cmd_key, None)
+                            exe = extract_exe_from_command(cmd)
+                            if exe:
+                                exe_paths.add(os.path.normpath(exe))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return list(exe_paths)
+
+# Launchers the browsers install next to their main image (PWA and app shortcuts start
+# through them); anything else that merely mentions a browser, e.g. msedgewebview2.exe, is left alone
+BROWSER_HELPER_IMAGES = ('chrome_proxy.exe', 'chrome_pwa_launcher.exe', 'msedge_proxy.exe', 'msedge_pwa_launcher.exe')
+
+_BROWSER_EXE_NAMES = frozenset(image.lower() for image in BROWSER_IMAGES + list(BROWSER_HELPER_IMAGES))
+
+def _list_discovery_dir(path, mtime_ns):
+    """One directory's browser executables and enterable subdirectories, as stored in DiscoveryIndex."""
+    exes, subdirs = [], []
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return None
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if not (hasattr(entry, 'is_junction') and entry.is_junction()):
+                    subdirs.append(entry.name)
+            elif entry.name.lower() in _BROWSER_EXE_NAMES and entry.is_file(follow_symlinks=False):
+                exes.append(entry.name)
+        except OSError:
+            continue
+    return {'mtime_ns': mtime_ns, 'exes': exes, 'subdirs': subdirs}
+
+def iter_browser_executables(base, max_depth=3):
+    """Yield browser executables under base, at most max_depth directories down.
+
+    Directories are only entered when within max_depth, so nothing deeper is ever
+    listed; symlinks and junctions are not followed.
+    """
+    stack = [(os.path.normpath(base), 0)]
+    while stack:
+        path, depth = stack.pop()
+        listing = _list_discovery_dir(path, None)
+        if listing is None:
+            continue
+        for name in listing['exes']:
+            yield os.path.normpath(os.path.join(path, name))
+        if depth < max_depth:
+            stack.extend((os.path.join(path, name), depth + 1) for name in listing['subdirs'])
+
+class DiscoveryIndex:
+    """On-disk cache of discovered browser executables, invalidated by directory mtimes.
+
+    For every directory within max_depth of a discovery root it stores the
+    directory's mtime_ns, the browser executables in it and its subdirectories.
+    A directory's mtime changes whenever an entry is added, removed or renamed,
+    so refresh_root() re-lists only directories whose mtime differs and reuses
+    the stored listing (one stat instead of a scandir) for the rest. Registry
+    results are reused while the StartMenuInternet keys' last-write times are
+    unchanged, and re-read at least every REGISTRY_MAX_AGE seconds.
+    """
+
+    VERSION = 2  # 2: executables matched by exact name instead of a substring pattern
+    REGISTRY_MAX_AGE = 600
+
+    def __init__(self, path=None, max_depth=3):
+        self.path = Path(path) if path is not None else None
+        self.max_depth = max_depth
+        self.dirs = {}  # root -> {dir path -> entry}
+        self.registry = None  # {'signature': [...], 'exes': [...], 'checked_at': ts}
+        self.dirty = False
+        self.stats = {'reused': 0, 'listed': 0}
+
+    @staticmethod
+    def default_path():
+        return Path.home() / "ExtensionGuardian" / "discovery_index.json"
+
+    @classmethod
+    def load(cls, path=None, max_depth=3, logger=None):
+        """Load the saved index; a missing, unreadable or outdated file gives an empty one."""
+        index = cls(path or cls.default_path(), max_depth)
+        try:
+            with open(index.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return index
+        except (OSError, ValueError) as e:
+            _get_logger(logger).debug(f"[DISCOVERY] Ignoring unreadable index {index.path}: {e}")
+            return index
+        if data.get('version') == cls.VERSION and data.get('max_depth') == max_depth:
+            index.dirs = data.get('dirs', {})
+            index.registry = data.get('registry')
+        return index
+
+    def save(self):
+        """Write the index (atomically) if anything changed since it was loaded or saved."""
+        if not self.dirty or self.path is None:
+            return False
+        data = {'version': self.VERSION, 'max_depth': self.max_depth, 'dirs': self.dirs, 'registry': self.registry}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        return True
+
+    def refresh_root(self, root):
+        """Browser executables under root, re-listing only directories whose mtime changed."""
+        previous = self.dirs.get(root, {})
+        current = {}
+        found = []
+        listed = reused = 0
+        stack = [(os.path.normpath(root), 0)]
+        while stack:
+            path, depth = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            entry = previous.get(path)
+            if entry is None or entry['mtime_ns'] != mtime_ns:
+                entry = _list_discovery_dir(path, mtime_ns)
+                if entry is None:
+                    continue
+                listed += 1
+            else:
+                reused += 1
+            current[path] = entry
+            found.extend(os.path.normpath(os.path.join(path, name)) for name in entry['exes'])
+            if depth < self.max_depth:
+                stack.extend((os.path.join(path, name), depth + 1) for name in entry['subdirs'])
+        # Roots are refreshed in parallel; each thread only replaces its own root's entry
+        if listed or current.keys() != previous.keys():
+            self.dirs[root] = current
+            self.dirty = True
+        self.stats['listed'] += listed
+        self.stats['reused'] += reused
+        return found
+
+    def registered_browser_exes(self):
+        signature = get_registry_signature()
+        cached = self.registry
+        if (cached is not None and cached.get('signature') == signature
+                and time.time() - cached.get('checked_at', 0) < self.REGISTRY_MAX_AGE):
+            return list(cached['exes'])
+        exes = get_registered_browser_exes()
+        self.registry = {'signature': signature, 'exes': exes, 'checked_at': time.time()}
+        self.dirty = True
+        return exes
+
+def discover_browsers_from_filesystem(roots=None, max_depth=3, index=None):
+    candidates = set()
+    if roots is None:
+        roots = [
+            os.environ.get('ProgramFiles'),
+            os.environ.get('ProgramFiles(x86)'),
+            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Programs'),
+            os.environ.get('LOCALAPPDATA'),
+        ]
+    roots = [p for p in dict.fromkeys(roots) if p and os.path.isdir(p)]
+
+    # Quick known paths without deep walking
+    known_rel_paths = [(install_dir.split('\\'), spec.image)
+                       for spec in BROWSER_CATALOG for install_dir in spec.install_dirs]
+    for root in roots:
+        for parts, exe_name in known_rel_paths:
+            p = os.path.join(root, *parts, exe_name)
+            if os.path.isfile(p):
+                candidates.add(os.path.normpath(p))
+
+    # Light scan of the top levels; the roots are independent, so walk them in parallel
+    if index is not None:
+        walk = index.refresh_root
+    else:
+        walk = lambda root: list(iter_browser_executables(root, max_depth))
+    if roots:
+        with ThreadPoolExecutor(max_workers=len(roots), thread_name_prefix="guardian-discover") as pool:
+            for found in pool.map(walk, roots):
+                candidates.update(found)
+
+    return list(candidates)
+
+def block_exe_firewall(exe_path, logger=None):
+    logger = _get_logger(logger)
+
+    rule_name = f"ExtensionGuardian_Block_{os.path.basename(exe_path)}"
+    _run_hidden(["netsh", "advfirewall", "firewall", "delete", "rule", f"name={rule_name}"], capture_output=True)
+    _run_hidden(["netsh", "advfirewall", "firewall", "add", "rule", f"name={rule_name}", "dir=out", "action=block", f"program={exe_path}", "enable=yes"], check=False, capture_output=True)
+    _run_hidden(["netsh", "advfirewall", "firewall", "add", "rule", f"name={rule_name}", "dir=in", "action=block", f"program={exe_path}", "enable=yes"], check=False, capture_output=True)
+    logger.info(f"Firewall block ensured for {exe_path}")
+    return True
+
+def terminate_process_trees(procs, timeout=1.0, logger=None):
+    """Terminate processes as trees: roots are signalled first, then their descendants, and the
+    whole set is collected with one psutil.wait_procs deadline; only survivors are killed.
+
+    Only processes in procs are signalled. Descendants outside it (native-messaging hosts,
+    apps launched from the browser) are left running and are not counted in the reports.
+
+    Returns one report per tree: {'root', 'processes', 'gone', 'killed', 'elapsed_ms'}.
+    """
+    logger = _get_logger(logger)
+    by_pid = {p.pid: p for p in procs}
+    roots = []
+    for proc in procs:
+        try:
+            if proc.ppid() not in by_pid:
+                roots.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+
+    trees = {}
+    covered = set()
+    for root in roots:
+        try:
+            descendants = root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            descendants = []
+        members = [root] + [d for d in descendants
+                            if d.pid in by_pid and d.pid not in covered and d.pid != root.pid]
+        covered.update(m.pid for m in members)
+        trees[root.pid] = members
+    # Processes the parent links did not reach (e.g. reparented mid-shutdown) form their own trees
+    for proc in procs:
+        if proc.pid not in covered:
+            trees[proc.pid] = [proc]
+            covered.add(proc.pid)
+
+    start = time.perf_counter()
+    gone_at = {}
+    signalled = []
+    ordered = [members[0] for members in trees.values()] + [m for members in trees.values() for m in members[1:]]
+    for proc in ordered:
+        try:
+            proc.terminate()
+            signalled.append(proc)
+        except psutil.NoSuchProcess:
+            gone_at[proc.pid] = time.perf_counter()
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+
+    def _on_gone(proc):
+        gone_at[proc.pid] = time.perf_counter()
+
+    _, alive = psutil.wait_procs(signalled, timeout=timeout, callback=_on_gone)
+    killed = set()
+    for proc in alive:
+        try:
+            if proc.status() == psutil.STATUS_ZOMBIE:
+                gone_at[proc.pid] = time.perf_counter()  # exited, just not reaped by its new parent yet
+                continue
+            proc.kill()
+            killed.add(proc.pid)
+        except psutil.NoSuchProcess:
+            gone_at[proc.pid] = time.perf_counter()
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    if killed:
+        psutil.wait_procs([p for p in alive if p.pid in killed], timeout=timeout, callback=_on_gone)
+
+    reports = []
+    for root_pid, members in trees.items():
+        gone = [gone_at[m.pid] for m in members if m.pid in gone_at]
+        elapsed_ms = (max(gone) - start) * 1000 if gone else 0.0
+        report = {
+            'root': root_pid,
+            'processes': len(members),
+            'gone': len(gone),
+            'killed': sum(1 for m in members if m.pid in killed),
+            'elapsed_ms': elapsed_ms,
+        }
+        reports.append(report)
+        logger.info(
+            f"[KILL] Process tree {root_pid}: {report['gone']}/{report['processes']} gone in "
+            f"{elapsed_ms:.0f} ms ({report['killed']} force-killed)"
+        )
+    return reports
+
+def kill_processes_for_exe(exe_path, logger=None, snapshot=None):
+    """Terminate every process running exe_path's image; pass a ProcessSnapshot to avoid re-enumerating."""
+    logger = _get_logger(logger)
+    image_name = os.path.basename(exe_path).lower()
+    logger.debug(f"Attempting to kill processes for image: {image_name}")
+    if snapshot is None:
+        snapshot = ProcessSnapshot.capture()
+
+    procs = []
+    for info in snapshot.matching(image_name):
+        try:
+            proc = psutil.Process(info.pid)
+            if info.create_time is not None and proc.create_time() != info.create_time:
+                continue  # PID was reused since the snapshot
+            procs.append(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    if not procs:
+        return 0
+
+    reports = terminate_process_trees(procs, logger=logger)
+    killed = sum(r['gone'] for r in reports)
+    if killed:
+        logger.info(f"Terminated {killed} process(es) for {exe_path}")
+    return killed
+
+TrackedProcess = namedtuple('TrackedProcess', 'pid create_time name exe')
+ProcessEvent = namedtuple('ProcessEvent', 'kind image pids')  # kind: 'started' or 'exited'
+
+class ProcessSnapshot:
+    """Immutable view of the process table for one cycle, indexed by lowercase image name.
+
+    Detection, browser closing and blocking all read from the same snapshot so an
+    enforcement pass enumerates processes once.
+    """
+
+    __slots__ = ('taken_at', 'by_image', '_by_base')
+
+    def __init__(self, processes, taken_at=None):
+        by_image = {}
+        by_base = {}
+        for proc in processes:
+            image = (proc.name or '').lower()
+            if not image:
+                continue
+            by_image.setdefault(image, []).append(proc)
+            by_base.setdefault(os.path.splitext(image)[0], []).append(proc)
+        self.taken_at = taken_at if taken_at is not None else time.time()
+        self.by_image = types.MappingProxyType({k: tuple(v) for k, v in by_image.items()})
+        self._by_base = types.MappingProxyType({k: tuple(v) for k, v in by_base.items()})
+
+    @classmethod
+    def capture(cls):
+        """Enumerate all processes once."""
+        procs = [
+            TrackedProcess(p.info['pid'], p.info['create_time'], p.info['name'] or '', p.info['exe'])
+            for p in psutil.process_iter(['pid', 'name', 'exe', 'create_time'])
+        ]
+        return cls(procs)
+
+    def matching(self, image_name):
+        """Processes whose image is image_name or shares its base name (e.g. chrome.exe and chrome)."""
+        return self._by_base.get(os.path.splitext(image_name.lower())[0], ())
+
+    def group(self, images):
+        """Process info dicts ({pid, name, exe}) grouped by image, for the images present."""
+        return {
+            image: [{'pid': p.pid, 'name': p.name, 'exe': p.exe} for p in self.by_image[image]]
+            for image in images if image in self.by_image
+        }
+
+    def __len__(self):
+        return sum(len(procs) for procs in self.by_image.values())
+
+class PsutilProcessProvider:
+    """Process source backed by psutil; ProcessTracker only asks it about PIDs it has not seen."""
+
+    def pids(self):
+        return psutil.pids()
+
+    def resolve(self, pid, exe_for_images):
+        """Return a TrackedProcess (exe only filled in for names in exe_for_images), or None if it exited."""
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                create_time = proc.create_time()
+                name = proc.name()
+                exe = None
+                if name.lower() in exe_for_images:
+                    try:
+                        exe = proc.exe()
+                    except psutil.AccessDenied:
+                        pass
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+        except psutil.AccessDenied:
+            return TrackedProcess(pid, None, '', None)
+        return TrackedProcess(pid, create_time, name, exe)
+
+class ProcessTracker:
+    """Keep a PID -> (create_time, name, exe) table up to date by diffing the PID set each cycle.
+
+    Only newly appeared PIDs are resolved; exe is only looked up for watched images.
+    refresh() returns ProcessEvent('started'/'exited', image, pids) for watched
+    images whose first process appeared or last process went away. A PID reused
+    between two close refreshes keeps its old entry; when the previous refresh is
+    more than resync_after seconds old every PID is resolved again, since an idle
+    back-off leaves plenty of time for PIDs to be recycled. The monitor passes
+    AdaptiveScheduler.idle_gap() so that only gaps longer than active polling resync;
+    resync_after=None never resyncs.
+    """
+
+    def __init__(self, watched_images, provider=None, on_event=None, resync_after=None, clock=time.monotonic):
+        self.watched_images = set(i.lower() for i in watched_images)
+        self.provider = provider or PsutilProcessProvider()
+        self.on_event = on_event
+        self.resync_after = resync_after
+        self.clock = clock
+        self.resolved_count = 0
+        self.resync_count = 0
+        self._table = {}
+        self._by_image = {image: {} for image in self.watched_images}
+        self._last_refresh = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        current = set(self.provider.pids())
+        now = self.clock()
+        with self._lock:
+            before = {image: list(procs) for image, procs in self._by_image.items() if procs}
+            if (self.resync_after is not None and self._last_refresh is not None
+                    and now - self._last_refresh > self.resync_after):
+                self.resync_count += 1
+                self._table.clear()
+                for procs in self._by_image.values():
+                    procs.clear()
+            self._last_refresh = now
+            for pid in self._table.keys() - current:
+                image = self._table.pop(pid).name.lower()
+                if image in self._by_image:
+                    del self._by_image[image][pid]
+            for pid in current - self._table.keys():
+                info = self.provider.resolve(pid, self.watched_images)
+                self.resolved_count += 1
+                if info is None:
+                    continue
+                self._table[pid] = info
+                image = info.name.lower()
+                if image in self._by_image:
+                    self._by_image[image][pid] = info
+            after = {image: list(procs) for image, procs in self._by_image.items() if procs}
+
+        events = [ProcessEvent('exited', image, before[image]) for image in before.keys() - after.keys()]
+        events += [ProcessEvent('started', image, after[image]) for image in after.keys() - before.keys()]
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        return events
+
+    def snapshot(self):
+        """ProcessSnapshot of the watched browser processes as of the last refresh()."""
+        with self._lock:
+            return ProcessSnapshot([p for procs in self._by_image.values() for p in procs.values()])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._table)
+
+class MonitoringEngine:
+    """Owns the guardian's asyncio loop, which runs on the one monitoring worker thread.
+
+    Each iteration awaits run_cycle(), asks next_interval() how long to wait and then
+    waits for a wakeup. If wait(timeout) is supplied it runs on a dedicated watcher
+    thread and interrupt() must make it return early; otherwise an asyncio.Event is
+    awaited. Blocking work goes through the loop's default executor, capped at
+    max_workers threads, so the thread count stays fixed. start(), stop() and
+    check_now() are idempotent and may be called from any thread; submit() runs a
+    coroutine on the loop and returns a concurrent.futures.Future.
+    """
+
+    def __init__(self, run_cycle, next_interval, wait=None, interrupt=None, logger=None, max_workers=4):
+        self.run_cycle = run_cycle
+        self.next_interval = next_interval
+        self.logger = _get_logger(logger)
+        self.max_workers = max_workers
+        self._wait = wait
+        self._interrupt = interrupt
+        self._wake_requested = threading.Event()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop = None
+        self._wake = None
+
+    @property
+    def is_running(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        """Start the worker unless it is already running; returns True if a worker was started."""
+        with self._lock:
+            if self.is_running:
+                return False
+            if self._thread is not None and self._thread.is_alive():
+                # A stop is still winding down; let it finish before starting over
+                self._thread.join()
+            self._stop.clear()
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="guardian-monitor", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=5.0):
+        """Stop the worker; pending tasks (e.g. countdowns) are cancelled."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stop.set()
+            self._signal()
+        if thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def check_now(self):
+        """Run a cycle as soon as possible (immediately if the worker is waiting)."""
+        self._signal()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the engine loop from any thread."""
+        if not self.is_running or not self._ready.wait(5):
+            coro.close()
+            raise RuntimeError("monitoring engine is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _signal(self):
+        self._wake_requested.set()
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self._interrupt is not None:
+            self._interrupt()
+
+    async def _sleep(self, timeout, use_wait=True):
+        if self._wake_requested.is_set():
+            return  # check_now() arrived while the cycle was running
+        wake = asyncio.ensure_future(self._wake.wait())
+        try:
+            if self._wait is None or not use_wait:
+                await asyncio.wait({wake}, timeout=timeout)
+                return
+            waiter = self._loop.run_in_executor(self._watch_executor, self._wait, timeout)
+            done, _ = await asyncio.wait({wake, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if waiter not in done:
+                self._interrupt()
+            await waiter
+        finally:
+            wake.cancel()
+
+    async def _main(self):
+        self._wake = asyncio.Event()
+        self._ready.set()
+        while not self._stop.is_set():
+            self._wake_requested.clear()
+            self._wake.clear()
+            try:
+                await self.run_cycle()
+                if self._stop.is_set():
+                    break
+                await self._sleep(self.next_interval())
+            except Exception as e:
+                self.logger.error(f"Error in monitoring loop: {e}")
+                await self._sleep(5, use_wait=False)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="guardian-scan")
+        self._watch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="guardian-watch")
+        loop.set_default_executor(executor)
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop = None
+            asyncio.set_event_loop(None)
+            loop.close()
+            executor.shutdown(wait=True)
+            self._watch_executor.shutdown(wait=True)
+
+class AdaptiveScheduler:
+    """Decide how long the monitor waits between check cycles.
+
+    Cycles run every base_interval seconds while a watched browser is running or a
+    profile is mid-transition; otherwise the wait doubles up to max_interval.
+    wake() (on a profile change or Check Now) drops straight back to base_interval.
+    """
+
+    def __init__(self, base_interval=1.0, max_interval=30.0, backoff=2.0):
+        self.base_interval = float(base_interval)
+        self.max_interval = max(float(max_interval), self.base_interval)
+        self.backoff = backoff
+        self.current = self.base_interval
+        self.cycles = 0
+        self._started_at = time.monotonic()
+        self._cpu_at_start = time.process_time()
+        self._lock = threading.Lock()
+
+    def next_interval(self, active):
+        with self._lock:
+            self.cycles += 1
+            if active:
+                self.current = self.base_interval
+            else:
+                self.current = min(self.max_interval, self.current * self.backoff)
+            return self.current
+
+    def wake(self):
+        with self._lock:
+            self.current = self.base_interval
+
+    def idle_gap(self):
+        """Shortest wait only an idle back-off produces; cycles further apart than this were idle."""
+        return self.base_interval * self.backoff
+
+    def stats(self):
+        """Cycles per hour and CPU seconds per hour since the scheduler was created."""
+        hours = max(time.monotonic() - self._started_at, 1e-9) / 3600
+        with self._lock:
+            cycles = self.cycles
+            interval = self.current
+        return {
+            'cycles_per_hour': cycles / hours,
+            'cpu_seconds_per_hour': (time.process_time() - self._cpu_at_start) / hours,
+            'current_interval': interval,
+        }
+
+def discover_installed_browser_paths(index=None):
+    paths = set()
+    registered = index.registered_browser_exes() if index is not None else get_registered_browser_exes()
+    for p in registered:
+        paths.add(os.path.normpath(p))
+    for p in discover_browsers_from_filesystem(max_depth=index.max_depth if index else 3, index=index):
+        paths.add(os.path.normpath(p))
+    return sorted(paths)
+
+def ensure_block_all_browsers(logger=None, index=None):
+    logger = _get_logger(logger)
+    results = {
+        'discovered': [],
+        'killed': {},
+    }
+    discovered = discover_installed_browser_paths(index)
+    if index is not None:
+        logger.debug(f"[DISCOVERY] {index.stats['reused']} dir(s) unchanged, {index.stats['listed']} re-listed")
+        index.stats = {'reused': 0, 'listed': 0}
+        try:
+            index.save()
+        except OSError as e:
+            logger.warning(f"[DISCOVERY] Could not save index: {e}")
+    results['discovered'] = discovered
+    snapshot = ProcessSnapshot.capture()
+    for exe in discovered:
+        image = os.path.basename(exe).lower()
+        logger.debug(f"Discovered browser candidate: exe='{exe}' image='{image}'")
+        killed_count = kill_processes_for_exe(exe, logger=logger, snapshot=snapshot)
+        results['killed'][exe] = killed_count
+    return results
+
+def run_browser_blocker_cli(watch=False, interval=10):
+    logger = _get_logger(None)
+    # Saved discovery results; each cycle only re-lists directories that changed
+    index = DiscoveryIndex.load(logger=logger)
+    if watch:
+        logger.info(f"Starting browser blocker in watch mode (interval={interval}s)")
+        while True:
+            res = ensure_block_all_browsers(logger=logger, index=index)
+            print(json.dumps(res, indent=2))
+            time.sleep(max(1, int(interval)))
+    else:
+        res = ensure_block_all_browsers(logger=logger, index=index)
+        print(json.dumps(res, indent=2))
+        return res
+
+class RingBufferLogHandler(logging.Handler):
+    """Keeps the most recent formatted log lines in memory for log snapshots.
+
+    Every emitted record gets the next line index (starting at 0, never reused).
+    Lines live in a fixed circular array, so emit() is O(1) and reading the last
+    k lines is O(k). The oldest lines are dropped once either max_lines or
+    max_bytes (UTF-8 size of the kept lines) would be exceeded.
+    """
+
+    def __init__(self, max_lines=5000, max_bytes=2 * 1024 * 1024, level=logging.NOTSET):
+        super().__init__(level)
+        self._lines = []
+        self._sizes = []
+        self.configure(max_lines, max_bytes)
+
+    def configure(self, max_lines, max_bytes):
+        """Change the line/byte budget, keeping as many of the newest lines as fit."""
+        self.acquire()
+        try:
+            kept = self._range(getattr(self, '_first', 0))
+            self.max_lines = max(1, int(max_lines))
+            self.max_bytes = max(1, int(max_bytes))
+            self._lines = [None] * self.max_lines
+            self._sizes = [0] * self.max_lines
+            self._next = getattr(self, '_next', 0)
+            self._first = self._next - len(kept)
+            self._bytes = 0
+            for index, line in zip(range(self._next - len(kept), self._next), kept):
+                self._store(index, line)
+        finally:
+            self.release()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        # Handler.handle() already holds self.lock around emit()
+        self._store(self._next, line)
+        self._next += 1
+
+    def _store(self, index, line):
+        size = len(line.encode('utf-8', 'replace'))
+        if index - self._first >= self.max_lines:
+            self._evict()
+        while self._first < index and self._bytes + size > self.max_bytes:
+            self._evict()
+        slot = index % self.max_lines
+        self._lines[slot] = line
+        self._sizes[slot] = size
+        self._bytes += size
+
+    def _evict(self):
+        slot = self._first % self.max_lines
+        self._bytes -= self._sizes[slot]
+        self._lines[slot] = None
+        self._sizes[slot] = 0
+        self._first += 1
+
+    def _range(self, start):
+        if not self._lines:
+            return []
+        start = max(start, self._first)
+        return [self._lines[i % self.max_lines] for i in range(start, self._next)]
+
+    def get_latest_line_index(self):
+        """Index of the newest line, or -1 if nothing has been logged yet."""
+        self.acquire()
+        try:
+            return self._next - 1
+        finally:
+            self.release()
+
+    def get_lines_since(self, index):
+        """Lines with index >= index that are still buffered, oldest first."""
+        self.acquire()
+        try:
+            return self._range(index)
+        finally:
+            self.release()
+
+    def get_all_lines(self):
+        self.acquire()
+        try:
+            return self._range(self._first)
+        finally:
+            self.release()
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that never blocks the logging thread.
+
+    When the queue is full, records below WARNING are dropped; a WARNING or worse
+    evicts the oldest queued record instead. Drops are counted in `dropped` and
+    reported by BatchingQueueListener.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare() the record is copied, since the ring-buffer and UI
+        # handlers format the caller's record on its own thread. The copy is not formatted
+        # here; only the message and traceback are merged, and the listener's formatters do the rest
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        # Handler.handle() holds self.lock here, so `dropped` needs no extra locking
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno < logging.WARNING:
+            self.dropped += 1
+            return
+        try:
+            self.queue.get_nowait()
+            self.dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener that drains up to batch_size records per wakeup.
+
+    Stream/file handlers get the whole batch in one write() and one flush()
+    instead of one of each per record; other handlers see records one by one.
+    """
+
+    def __init__(self, log_queue, *handlers, batch_size=256, source=None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.source = source
+        self._reported_drops = 0
+
+    def enqueue_sentinel(self):
+        # The queue may be full; wait for room rather than raising queue.Full
+        self.queue.put(self._sentinel, timeout=5)
+
+    def _monitor(self):
+        q = self.queue
+        stopping = False
+        while not stopping:
+            batch = []
+            record = q.get()
+            while True:
+                q.task_done()
+                if record is self._sentinel:
+                    stopping = True
+                    break
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+            self.write_batch(batch)
+
+    def write_batch(self, batch):
+        dropped = self.source.dropped if self.source is not None else 0
+        if dropped > self._reported_drops:
+            batch.append(logging.makeLogRecord({
+                'name': 'extension_guardian', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"[LOGGING] Dropped {dropped - self._reported_drops} record(s): log queue full",
+            }))
+            self._reported_drops = dropped
+        for handler in self.handlers:
+            records = [r for r in batch if r.levelno >= handler.level and handler.filter(r)]
+            if not records:
+                continue
+            if not isinstance(handler, logging.StreamHandler):
+                for record in records:
+                    handler.handle(record)
+                continue
+            handler.acquire()
+            try:
+                rollover_if_due = getattr(handler, 'rollover_if_due', None)
+                if rollover_if_due is not None:
+                    rollover_if_due()
+                handler.stream.write(''.join(handler.format(r) + handler.terminator for r in records))
+                handler.flush()
+            except Exception:
+                handler.handleError(records[-1])
+            finally:
+                handler.release()
+
+class RepeatSuppressionFilter(logging.Filter):
+    """Collapses a record repeated within a window into the first line plus summaries.
+
+    Records are keyed on (logger, level, message template, arguments), or on a
+    `repeat_key` passed via `extra=` for lines whose arguments change every time
+    (e.g. a counter). The first record of a key passes; repeats inside its window
+    are counted instead. When the window ends with repeats pending, one
+    "[REPEATED xN in Ts]" line carrying the latest message is emitted through
+    `emit`, and if the message is still recurring the window doubles (up to
+    max_window). Otherwise the key is forgotten and its next record passes again.
+    """
+
+    def __init__(self, emit, window=10.0, max_window=600.0, max_keys=1024, clock=time.monotonic):
+        super().__init__()
+        self.emit = emit
+        self.window = window
+        self.max_window = max_window
+        self.max_keys = max_keys
+        self.clock = clock
+        self.suppressed_total = 0
+        self._entries = OrderedDict()  # key -> [window_start, window, repeats, last_record, last_seen]
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _key(self, record):
+        key = getattr(record, 'repeat_key', None)
+        if key is not None:
+            return (record.name, record.levelno, key)
+        args = record.args
+        try:
+            hash(args)
+        except TypeError:
+            args = repr(args)
+        return (record.name, record.levelno, record.msg, args)
+
+    def filter(self, record):
+        if getattr(record, 'repeat_summary', False):
+            return True
+        now = self.clock()
+        key = self._key(record)
+        with self._lock:
+            summaries = self._sweep(now) if now >= self._next_sweep else []
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < entry[1]:
+                entry[2] += 1
+                entry[3] = record
+                entry[4] = now
+                self.suppressed_total += 1
+                allow = False
+            else:
+                self._entries[key] = [now, self.window, 0, record, now]
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_keys:
+                    _, evicted = self._entries.popitem(last=False)
+                    if evicted[2]:
+                        summaries.append(self._summary(evicted, now))
+                allow = True
+        for summary in summaries:
+            self.emit(summary)
+        return allow
+
+    def flush(self):
+        """Emit summaries for every key with pending repeats, e.g. before shutdown."""
+        with self._lock:
+            now = self.clock()
+            summaries = [self._summary(entry, now) for entry in self._entries.values() if entry[2]]
+            self._entries.clear()
+        for summary in summaries:
+            self.emit(summary)
+
+    def _sweep(self, now):
+        self._next_sweep = now + 1.0
+        summaries = []
+        for key, entry in list(self._entries.items()):
+            if now - entry[0] < entry[1]:
+                continue
+            if entry[2]:
+                summaries.append(self._summary(entry, now))
+            if entry[2] and now - entry[4] < self.window:
+                entry[0], entry[1], entry[2] = now, min(self.max_window, entry[1] * 2), 0
+            else:
+                del self._entries[key]
+        return summaries
+
+    def _summary(self, entry, now):
+        last = entry[3]
+        return logging.makeLogRecord({
+            'name': last.name, 'levelno': last.levelno, 'levelname': last.levelname,
+            'msg': f"[REPEATED x{entry[2]} in {now - entry[0]:.0f}s] {last.getMessage()}",
+            'repeat_summary': True,
+        })
+
+class LogArchiver:
+    """Background gzip compression and size-budget retention for the log directory.
+
+    submit(path) gzips path to path + '.gz' (removing the original) on a single
+    worker thread, then deletes the oldest *.log / *.log.gz files under log_dir and
+    log_dir/snapshots until the total fits retention_bytes. Paths returned by
+    active_paths() are never compressed or deleted.
+    """
+
+    SUFFIXES = ('.log', '.log.gz')
+
+    def __init__(self, log_dir, retention_bytes, active_paths=tuple, logger=None):
+        self.log_dir = Path(log_dir)
+        self.retention_bytes = retention_bytes
+        self.active_paths = active_paths
+        self.logger = _get_logger(logger)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path=None):
+        """Compress path (if given) and apply retention, in the background."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="guardian-log-archiver", daemon=True)
+                self._thread.start()
+        self._queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is not None:
+                    self.compress(Path(path))
+                if self._queue.empty():
+                    # Only once pending files are compressed, so they count at their archived size
+                    self.enforce_retention()
+            except Exception as e:
+                self.logger.warning(f"[LOG ARCHIVE] Failed: {e}")
+
+    def compress(self, path):
+        if not path.exists() or self._is_active(path):
+            return None
+        archive = path.with_name(path.name + '.gz')
+        try:
+            st = path.stat()
+            with open(path, 'rb') as src, gzip.open(archive, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            # Keep the original mtime so retention still deletes oldest-first
+            os.utime(archive, ns=(st.st_atime_ns, st.st_mtime_ns))
+            path.unlink()
+        except OSError as e:
+            self.logger.warning(f"[LOG ARCHIVE] Could not compress {path.name}: {e}")
+            try:
+                archive.unlink()
+            except OSError:
+                pass
+            return None
+        return archive
+
+    def _is_active(self, path):
+        return any(os.path.abspath(path) == os.path.abspath(p) for p in self.active_paths())
+
+    def iter_log_files(self):
+        """(mtime, size, path) for every log and archive under log_dir and snapshots/."""
+        for directory in (self.log_dir, self.log_dir / "snapshots"):
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith(self.SUFFIXES):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        yield st.st_mtime, st.st_size, Path(entry.path)
+                except OSError:
+                    continue
+
+    def enforce_retention(self):
+        files = sorted(self.iter_log_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.retention_bytes:
+                break
+            if self._is_active(path):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.logger.info(f"[LOG ARCHIVE] Removed {path.name} ({size} bytes) to stay within retention budget")
+
+class DailyRotatingFileHandler(logging.FileHandler):
+    """Writes <log_dir>/<prefix>_YYYYMMDD.log and rolls over at local midnight or at max_bytes.
+
+    A file that fills up during the day is renamed to <prefix>_YYYYMMDD.N.log.
+    Finished files are handed to archiver.submit() for compression and retention.
+    """
+
+    def __init__(self, log_dir, prefix="guardian", max_bytes=10 * 1024 * 1024, archiver=None):
+        self.log_dir = Path(log_dir)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.archiver = archiver
+        self._set_day(datetime.now())
+        super().__init__(self._path_for_day(), encoding='utf-8')
+
+    def _set_day(self, now):
+        self._day = now.date()
+        self._next_midnight = datetime.combine(self._day + timedelta(days=1), datetime.min.time()).timestamp()
+
+    def _path_for_day(self):
+        return self.log_dir / f"{self.prefix}_{self._day:%Y%m%d}.log"
+
+    def rollover_if_due(self):
+        """Roll over if midnight passed or the file is full; the caller holds self.lock."""
+        if time.time() >= self._next_midnight:
+            self.rollover(new_day=True)
+        elif self.max_bytes and self.stream is not None and os.fstat(self.stream.fileno()).st_size >= self.max_bytes:
+            self.rollover(new_day=False)
+
+    def rollover(self, new_day):
+        finished = Path(self.baseFilename)
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if not new_day:
+            part = 1
+            while True:
+                rotated = finished.with_name(f"{finished.stem}.{part}.log")
+                if not rotated.exists() and not rotated.with_name(rotated.name + '.gz').exists():
+                    break
+                part += 1
+            os.replace(finished, rotated)
+            finished = rotated
+        self._set_day(datetime.now())
+        self.baseFilename = os.path.abspath(self._path_for_day())
+        self.stream = self._open()
+        if self.archiver is not None:
+            self.archiver.submit(finished)
+
+    def emit(self, record):
+        # Handler.handle() holds self.lock around emit()
+        try:
+            self.rollover_if_due()
+        except OSError:
+            self.handleError(record)
+        super().emit(record)
+
+class EventJournal:
+    """Append-only JSONL journal of state transitions with a sparse time index.
+
+    Events go to <journal_dir>/events_YYYYMMDD.jsonl, one JSON object per line with
+    at least "ts" (epoch seconds) and "kind". Every index_every-th event of a
+    segment (and its first) adds a "<ts> <byte offset>" line to the matching .idx
+    file, so query() only opens the segments of the requested days and seeks
+    close to `since` instead of reading everything. Segments older than
+    retention_days are deleted when a new day starts.
+    """
+
+    def __init__(self, journal_dir, index_every=64, retention_days=90):
+        self.journal_dir = Path(journal_dir)
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.index_every = index_every
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._day = None
+        self._stream = None
+        self._index_stream = None
+        self._since_index = 0
+
+    def _segment_paths(self, day):
+        stem = f"events_{day}"
+        return self.journal_dir / f"{stem}.jsonl", self.journal_dir / f"{stem}.idx"
+
+    def _open_day(self, day):
+        self.close()
+        jsonl_path, idx_path = self._segment_paths(day)
+        self._stream = open(jsonl_path, 'ab')
+        self._index_stream = open(idx_path, 'a', encoding='ascii')
+        self._day = day
+        self._since_index = 0
+        self._prune()
+
+    def append(self, kind, ts=None, **fields):
+        """Record one event (at ts, default now; keep ts non-decreasing); returns the stored dict."""
+        event = {'ts': round(time.time() if ts is None else ts, 3), 'kind': kind}
+        event.update(fields)
+        line = (json.dumps(event, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+        day = datetime.fromtimestamp(event['ts']).strftime('%Y%m%d')
+        with self._lock:
+            if day != self._day:
+                self._open_day(day)
+            offset = self._stream.tell()
+            self._stream.write(line)
+            self._stream.flush()
+            if self._since_index == 0:
+                self._index_stream.write(f"{event['ts']} {offset}\n")
+                self._index_stream.flush()
+            self._since_index = (self._since_index + 1) % self.index_every
+        return event
+
+    def close(self):
+        for stream in (self._stream, self._index_stream):
+            if stream is not None:
+                stream.close()
+        self._stream = self._index_stream = None
+
+    def _prune(self):
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime('%Y%m%d')
+        for path in self.journal_dir.glob('events_*.*'):
+            if path.stem[len('events_'):] < cutoff:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _start_offset(self, idx_path, since):
+        if since is None:
+            return 0
         try:
-            with winreg.OpenKey(hive, root) as key:
-                idx = 0
-                while True:
-                    try:
-                        sub_name = winreg.EnumKey(key, idx)
-                        idx += 1
-                    except OSError:
-                        break
-                    try:
-                        cmd_key_path = root + f"\\{sub_name}\\shell\\open\\command"
-                        with winreg.OpenKey(hive, cmd_key_path) as cmd_key:
-                            cmd, _ = winreg.QueryValueEx(cmd_key, None)
-                            exe = extract_exe_from_command(cmd)
-                            if exe:
-                                exe_paths.add(os.path.normpath(exe))
-                    except OSError:
-                        continue
+            with open(idx_path, 'r', encoding='ascii') as f:
+                entries = [line.split() for line in f if line.strip()]
         except OSError:
-            continue
-    return list(exe_paths)
-
-def discover_browsers_from_filesystem():
-    candidates = set()
-    roots = [
-        os.environ.get('ProgramFiles'),
-        os.environ.get('ProgramFiles(x86)'),
-        os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Programs'),
-        os.environ.get('LOCALAPPDATA'),
-    ]
-    roots = [p for p in roots if p and os.path.isdir(p)]
+            return 0
+        stamps = [float(ts) for ts, _ in entries]
+        # Last indexed event strictly before `since`; equal timestamps may precede the next entry
+        pos = bisect.bisect_left(stamps, since) - 1
+        return int(entries[pos][1]) if pos >= 0 else 0
 
-    # Quick known paths without deep walking
-    known_rel_paths = [
-        (['Google', 'Chrome', 'Application'], 'chrome.exe'),
-        (['Microsoft', 'Edge', 'Application'], 'msedge.exe'),
-        (['BraveSoftware', 'Brave-Browser', 'Application'], 'brave.exe'),
-        (['CentBrowser', 'Application'], 'chrome.exe'),
-        (['Chromium', 'Application'], 'chrome.exe'),
-        (['Perplexity', 'Comet', 'Application'], 'comet.exe'),
-    ]
-    for root in roots:
-        for parts, exe_name in known_rel_paths:
-            p = os.path.join(root, *parts, exe_name)
-            if os.path.isfile(p):
-                candidates.add(os.path.normpath(p))
+    def query(self, since=None, until=None, kinds=None, browser=None, limit=None):
+        """Events with since <= ts <= until (epoch seconds), oldest first.
 
-    # Light scan: walk only top 3 levels, filter by keywords and known exe names
-    def shallow_walk(base, max_depth=3):
-        base = os.path.normpath(base)
-        for dirpath, dirnames, filenames in os.walk(base):
-            depth = os.path.normpath(dirpath).count(os.sep) - base.count(os.sep)
-            if depth > max_depth:
-                # prune deeper traversal
-                dirnames[:] = []
+        kinds filters on event kind; limit keeps only the newest `limit` matches.
+        """
+        first_day = datetime.fromtimestamp(since).strftime('%Y%m%d') if since is not None else None
+        last_day = datetime.fromtimestamp(until).strftime('%Y%m%d') if until is not None else None
+        kinds = set(kinds) if kinds else None
+        # append() writes compact JSON starting with "ts", so most lines can be
+        # rejected on raw bytes before paying for json.loads
+        kind_needles = [f'"kind":{json.dumps(k)}'.encode('utf-8') for k in kinds] if kinds else None
+        with self._lock:
+            if self._stream is not None:
+                self._stream.flush()
+        events = []
+        for jsonl_path in sorted(self.journal_dir.glob('events_*.jsonl')):
+            day = jsonl_path.stem[len('events_'):]
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            offset = self._start_offset(jsonl_path.with_suffix('.idx'), since)
+            try:
+                with open(jsonl_path, 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        try:
+                            ts = float(line[6:line.index(b',')])
+                        except ValueError:
+                            continue  # Torn final line from a crash
+                        if since is not None and ts < since:
+                            continue
+                        if until is not None and ts > until:
+                            break
+                        if kind_needles and not any(needle in line for needle in kind_needles):
+                            continue
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue
+                        if kinds and event.get('kind') not in kinds:
+                            continue
+                        if browser and event.get('browser') != browser:
+                            continue
+                        events.append(event)
+            except OSError:
                 continue
-            for fname in filenames:
-                lower = fname.lower()
-                VENDOR_OR_PRODUCT_KEYWORDS = ['chrome', 'chromium', 'edge', 'comet']
-                if lower in ['chrome.exe', 'msedge.exe', 'brave.exe', 'comet.exe'] or any(k in lower for k in VENDOR_OR_PRODUCT_KEYWORDS):
-                    full = os.path.join(dirpath, fname)
-                    candidates.add(os.path.normpath(full))
+        return events[-limit:] if limit else events
 
-    for root in roots:
-        shallow_walk(root, max_depth=3)
+def format_event(event):
+    """One human-readable line for a journal event."""
+    when = datetime.fromtimestamp(event.get('ts', 0)).strftime('%Y-%m-%d %H:%M:%S')
+    details = ' '.join(f"{k}={v}" for k, v in event.items() if k not in ('ts', 'kind'))
+    return f"{when} [{event.get('kind', '?').upper()}] {details}".rstrip()
 
-    return list(candidates)
+class UiUpdateChannel:
+    """Thread-safe hand-off of GUI updates to the Tk thread.
 
-def block_exe_firewall(exe_path, logger=None):
-    logger = _get_logger(logger)
+    set(name, value) coalesces to the latest value per name; append_line()
+    queues Activity Log lines, keeping at most max_pending_lines (the oldest are
+    dropped and counted). The Tk thread takes everything at once with drain().
+    """
 
-    rule_name = f"ExtensionGuardian_Block_{os.path.basename(exe_path)}"
-    _run_hidden(["netsh", "advfirewall", "firewall", "delete", "rule", f"name={rule_name}"], capture_output=True)
-    _run_hidden(["netsh", "advfirewall", "firewall", "add", "rule", f"name={rule_name}", "dir=out", "action=block", f"program={exe_path}", "enable=yes"], check=False, capture_output=True)
-    _run_hidden(["netsh", "advfirewall", "firewall", "add", "rule", f"name={rule_name}", "dir=in", "action=block", f"program={exe_path}", "enable=yes"], check=False, capture_output=True)
-    logger.info(f"Firewall block ensured for {exe_path}")
-    return True
+    def __init__(self, max_pending_lines=2000):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._lines = deque(maxlen=max_pending_lines)
+        self._dropped = 0
 
-def kill_processes_for_exe(exe_path, logger=None):
-    logger = _get_logger(logger)
-    killed = 0
-    image_name = os.path.basename(exe_path).lower()
-    logger.debug(f"Attempting to kill processes for image: {image_name}")
-    target_base = os.path.splitext(image_name)[0]
+    def set(self, name, value):
+        with self._lock:
+            self._values[name] = value
+
+    def append_line(self, line):
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self._dropped += 1
+            self._lines.append(line)
+
+    def drain(self):
+        """Return (latest values, pending lines, dropped line count) and reset them."""
+        with self._lock:
+            values, self._values = self._values, {}
+            lines = list(self._lines)
+            self._lines.clear()
+            dropped, self._dropped = self._dropped, 0
+        return values, lines, dropped
+
+class UiLogHandler(logging.Handler):
+    """Forwards formatted log lines to a UiUpdateChannel (an O(1) append; Tk is never touched here)."""
 
-    for proc in psutil.process_iter(['pid', 'name']):
+    def __init__(self, channel, level=logging.INFO):
+        super().__init__(level)
+        self.channel = channel
+
+    def emit(self, record):
         try:
-            pname = (proc.info.get('name') or '').lower()
-            if not pname:
-                continue
-            if pname == image_name or os.path.splitext(pname)[0] == target_base:
-                try:
-                    proc.terminate()
-                    proc.wait(timeout=0.5)
-                except psutil.TimeoutExpired:
-                    proc.kill()
-                killed += 1
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            continue
-    if killed:
-        logger.info(f"Terminated {killed} process(es) for {exe_path}")
-    return killed
+            self.channel.append_line(self.format(record))
+        except Exception:
+            self.handleError(record)
 
-def discover_installed_browser_paths():
-    paths = set()
-    for p in get_registered_browser_exes():
-        paths.add(os.path.normpath(p))
-    for p in discover_browsers_from_filesystem():
-        paths.add(os.path.normpath(p))
-    return sorted(paths)
+class StatusText:
+    """Thread-safe status string; any thread may set() it.
 
-def ensure_block_all_browsers(logger=None):
-    logger = _get_logger(logger)
-    results = {
-        'discovered': [],
-        'killed': {},
-    }
-    discovered = discover_installed_browser_paths()
-    results['discovered'] = discovered
-    for exe in discovered:
-        image = os.path.basename(exe).lower()
-        logger.debug(f"Discovered browser candidate: exe='{exe}' image='{image}'")
-        killed_count = kill_processes_for_exe(exe, logger=logger)
-        results['killed'][exe] = killed_count
-    return results
+    With a channel, every set() is also published as `name` for the Tk thread
+    to pick up, so background code never calls into Tk directly.
+    """
 
-def run_browser_blocker_cli(watch=False, interval=10):
-    logger = _get_logger(None)
-    if watch:
-        logger.info(f"Starting browser blocker in watch mode (interval={interval}s)")
-        while True:
-            res = ensure_block_all_browsers(logger=logger)
-            print(json.dumps(res, indent=2))
-            time.sleep(max(1, int(interval)))
-    else:
-        res = ensure_block_all_browsers(logger=logger)
-        print(json.dumps(res, indent=2))
-        return res
+    def __init__(self, value="", channel=None, name="status"):
+        self._value = value
+        self._lock = threading.Lock()
+        self.channel = channel
+        self.name = name
+
+    def get(self):
+        with self._lock:
+            return self._value
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+        if self.channel is not None:
+            self.channel.set(self.name, value)
 
 class ExtensionGuardian:
     FORCED_EXTENSION_ID = "cefohabdfmncmcilofdoodoaibcaakbc"
     
-    def __init__(self, background_mode=True):
-        self.root = tk.Tk()
-        self.root.title(f"Extension Guardian")
-        self.root.geometry("800x600")
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+    def __init__(self, background_mode=True, headless=False):
+        # tkinter/pystray/PIL are only imported once a window or tray is requested
+        self.root = None
+        self.headless = headless
+        self.ui = UiUpdateChannel()
+        self.status_var = StatusText("Monitoring...", channel=self.ui)
         
         self.background_mode = True
         
@@ -215,29 +2141,61 @@ class ExtensionGuardian:
             'monitoring_enabled': True,
             'browser_close_enabled': True,
             'check_interval_seconds': 1,
+            'idle_interval_max_seconds': 30,
             'warning_countdown_seconds': 15,
-            'browsers': ['chrome.exe', 'msedge.exe', 'brave.exe', 'comet.exe']
+            'log_buffer_max_lines': 5000,
+            'log_buffer_max_bytes': 2 * 1024 * 1024,
+            'log_max_file_mb': 10,
+            'log_retention_mb': 200,
+            'extra_extension_ids': [],
+            'browsers': list(BROWSER_IMAGES)
         }
         
-        self.is_monitoring = False
         self.extension_status = {}
+        self.extension_states = {}  # browser image -> ExtensionStates from its latest scan
         self.browser_processes = []
-        self.monitoring_thread = None
         self.shutdown_in_progress = False
         self.last_shutdown_time = None
         self.consecutive_disabled_counts = {}  # Track consecutive "disabled" detections per browser
         self.CONSECUTIVE_CHECKS_REQUIRED = 3  # Require 3 consecutive checks before shutdown
+        self.LOG_QUEUE_SIZE = 10000  # Records waiting for the log writer before drops start
+        self.ACTIVITY_LOG_MAX_LINES = 1000  # Older Activity Log lines are trimmed from the widget
+        self.QUICK_CHECK_MAX_AGE = 10  # Seconds a monitor verdict may be reused by the quick check
+        self.quick_check_running = False
         self.extension_disabled_warning_shown = False  # debounce warning popup per shutdown cycle
         
+        self.prefs_cache = PreferencesCache()
+        self.local_state_profiles = LocalStateProfiles()
+        self.monitoring_engine = None
+        self.countdown_future = None
+        self.countdown_browsers = []  # Browsers the running countdown will close
+        self.process_tracker = None
+        self.process_snapshot = None
+        self.change_source = None
+        self.dirty_browsers = set()  # Browsers whose Preferences changed since their last scan
+        self.dirty_lock = threading.Lock()
+        self.FULL_RESCAN_SECONDS = 30  # Rescan even without change events, in case one was missed
         self.recent_log_handler = None
         self.last_snapshot_line = 0
         self.snapshot_anchor_line = 0
+        self.snapshot_anchor_time = None
+        self.profile_states = {}  # (browser, base path, profile, extension) -> last journaled state
+        self.profile_states_lock = threading.Lock()
+        
+        self.show_requested = threading.Event()  # Set by the tray's "Show Window"; run() then builds the window
         
         self.setup_logging()
-        self.setup_gui()
         self.load_config()
         # Enforce forced ID after loading any saved config
         self.config['extension_id'] = self.FORCED_EXTENSION_ID
+        self.recent_log_handler.configure(self.config['log_buffer_max_lines'],
+                                          self.config['log_buffer_max_bytes'])
+        self.log_file_handler.max_bytes = self.config['log_max_file_mb'] * 1024 * 1024
+        self.log_archiver.retention_bytes = self.config['log_retention_mb'] * 1024 * 1024
+        self.archive_stale_logs()
+        self.scheduler = AdaptiveScheduler(self.config['check_interval_seconds'],
+                                           self.config['idle_interval_max_seconds'])
+        self.last_scheduler_report = time.monotonic()
 
         # Ensure the desktop app starts in background at user logon
         self.ensure_startup_registration()
@@ -248,23 +2206,63 @@ class ExtensionGuardian:
     def setup_logging(self):
         log_dir = Path.home() / "ExtensionGuardian" / "logs"
         log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / f"guardian_{datetime.now().strftime('%Y%m%d')}.log"
         self.log_dir = log_dir
-        self.current_log_path = log_file
+        # Rotation/retention limits are updated from the saved config in __init__
+        self.log_archiver = LogArchiver(log_dir, self.config['log_retention_mb'] * 1024 * 1024,
+                                        active_paths=lambda: (self.current_log_path,))
+        self.log_file_handler = DailyRotatingFileHandler(log_dir, max_bytes=self.config['log_max_file_mb'] * 1024 * 1024,
+                                                         archiver=self.log_archiver)
         
-        logging.basicConfig(
-            level=logging.DEBUG,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler(),
-            ]
-        )
-        for handler in logging.getLogger().handlers:
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        output_handlers = [
+            self.log_file_handler,
+            logging.StreamHandler(),
+        ]
+        for handler in output_handlers:
+            handler.setFormatter(formatter)
             handler.setLevel(logging.DEBUG)
+        # File/console I/O happens on the listener thread; logging calls only enqueue
+        log_queue = queue.Queue(maxsize=self.LOG_QUEUE_SIZE)
+        self.log_queue_handler = DroppingQueueHandler(log_queue)
+        self.log_listener = BatchingQueueListener(log_queue, *output_handlers, source=self.log_queue_handler)
+        # Collapse lines repeated every cycle (e.g. a browser that stays disabled) before they are queued
+        self.log_repeat_filter = RepeatSuppressionFilter(self.log_queue_handler.handle)
+        self.log_queue_handler.addFilter(self.log_repeat_filter)
+        self.log_listener.start()
+        atexit.register(self.log_listener.stop)
+        atexit.register(self.log_repeat_filter.flush)
+        root_logger = logging.getLogger()
+        root_logger.setLevel(logging.DEBUG)
+        root_logger.addHandler(self.log_queue_handler)
+        # In-memory tail of the log for snapshots; resized once the saved config is loaded
+        self.recent_log_handler = RingBufferLogHandler(self.config['log_buffer_max_lines'],
+                                                       self.config['log_buffer_max_bytes'])
+        self.recent_log_handler.setFormatter(formatter)
+        # Kept synchronous (it is O(1) and in memory) so snapshot anchors see every line immediately
+        root_logger.addHandler(self.recent_log_handler)
         self.logger = logging.getLogger(__name__)
+        self.journal = EventJournal(log_dir / "journal")
+
+    @property
+    def current_log_path(self):
+        return Path(self.log_file_handler.baseFilename)
+
+    def archive_stale_logs(self):
+        """Queue compression of plain-text logs and snapshots left over from earlier runs."""
+        for _, _, path in self.log_archiver.iter_log_files():
+            if path.suffix == '.log' and path != self.current_log_path:
+                self.log_archiver.submit(path)
+        self.log_archiver.submit()
     
     def setup_gui(self):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.root = tk.Tk()
+        self.root.title(f"Extension Guardian")
+        self.root.geometry("800x600")
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+
         # Minimal single-view interface
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill='both', expand=True, padx=20, pady=20)
@@ -272,11 +2270,12 @@ class ExtensionGuardian:
         title_label = ttk.Label(main_frame, text="Extension Guardian", font=('Arial', 16, 'bold'))
         title_label.pack(pady=10)
         
-        self.status_var = tk.StringVar(value="Monitoring...")
+        # Only the Tk thread touches this; others go through self.status_var and the UI channel
+        self.status_tk_var = tk.StringVar(value=self.status_var.get())
         status_frame = ttk.LabelFrame(main_frame, text="Status")
         status_frame.pack(fill='x', pady=10)
         
-        self.status_label = ttk.Label(status_frame, textvariable=self.status_var, font=('Arial', 12))
+        self.status_label = ttk.Label(status_frame, textvariable=self.status_tk_var, font=('Arial', 12))
         self.status_label.pack(pady=10)
         
         # Simple log viewer
@@ -285,6 +2284,14 @@ class ExtensionGuardian:
         
         self.log_text = tk.Text(log_frame, height=10, wrap='word', state='disabled')
         self.log_text.pack(fill='both', expand=True, padx=5, pady=5)
+        # Recent state transitions from the journal first, then live INFO+ log lines and
+        # transitions, all delivered through the UI channel in batches
+        for event in self.journal.query(since=time.time() - 24 * 3600, limit=200):
+            self.ui.append_line(format_event(event))
+        ui_log_handler = UiLogHandler(self.ui)
+        ui_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', '%H:%M:%S'))
+        logging.getLogger().addHandler(ui_log_handler)
+        self.root.after(0, self.pump_ui_updates)
         
         # Extension status checker
         check_frame = ttk.LabelFrame(main_frame, text="Quick Check")
@@ -302,75 +2309,112 @@ class ExtensionGuardian:
         ttk.Button(main_frame, text="Save Log Snapshot Now", command=self.manual_save_log_snapshot).pack(pady=5)
         ttk.Button(main_frame, text="View Logs Folder", command=self.view_logs).pack(pady=5)
     
+    @property
+    def is_monitoring(self):
+        return self.monitoring_engine is not None and self.monitoring_engine.is_running
+
     def start_monitoring(self):
-        if self.is_monitoring:
-            return
-        
-        self.is_monitoring = True
-        self.status_var.set("Monitoring Active")
-        
-        self.monitoring_thread = threading.Thread(target=self.monitoring_loop, daemon=True)
-        self.monitoring_thread.start()
-            
-    def monitoring_loop(self):
-        while self.is_monitoring:
-            try:
-                self.check_browsers_and_extensions()
-                time.sleep(1)
-            except Exception as e:
-                self.logger.error(f"Error in monitoring loop: {e}")
-                time.sleep(5)
-    
-    def check_browsers_and_extensions(self):
+        if self.monitoring_engine is None:
+            self.monitoring_engine = MonitoringEngine(
+                self.check_browsers_and_extensions_async,
+                self.next_wait_interval,
+                wait=self.wait_for_profile_changes,
+                interrupt=self.interrupt_profile_wait,
+                logger=self.logger,
+            )
+        if self.monitoring_engine.start():
+            self.status_var.set("Monitoring Active")
+
+    def stop_monitoring(self):
+        if self.monitoring_engine is not None:
+            self.monitoring_engine.stop()
+            if self.countdown_future is not None:
+                # The stop cancelled the countdown, possibly before its finally block could run
+                self.countdown_future = None
+                self.shutdown_in_progress = False
+                self.extension_disabled_warning_shown = False
+
+    def check_now(self):
+        """Wake the monitor for an immediate cycle (no-op if monitoring is stopped)."""
+        self.scheduler.wake()
+        if self.monitoring_engine is not None:
+            self.monitoring_engine.check_now()
+
+    async def check_browsers_and_extensions_async(self):
+        """Run one check cycle on the engine loop; browser scans run concurrently in its executor."""
+        loop = asyncio.get_running_loop()
         if self.shutdown_in_progress:
-            self.logger.debug("Shutdown in progress; skipping check cycle")
+            names = list(self.countdown_browsers)
+            results = await asyncio.gather(*(
+                loop.run_in_executor(None, self.check_extension_status, name) for name in names
+            ))
+            self.review_countdown(dict(zip(names, results)))
             return
+        snapshot = await loop.run_in_executor(None, self.take_process_snapshot)
+        plan, to_scan = self.plan_check_cycle(snapshot)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, self.check_extension_status, plan[key][0]['name'])
+            for key in to_scan
+        ))
+        self.apply_check_results(plan, dict(zip(to_scan, results)))
+
+    def plan_check_cycle(self, snapshot):
+        """Group running browsers by image and pick the ones whose verdict must be rescanned."""
+        allowed_set = set(b.lower() for b in self.config['browsers'])
+        # One scan per browser image per cycle; the verdict applies to all of its processes
+        plan = snapshot.group(allowed_set)
+        to_scan = []
+        for browser_key in plan:
+            if self._can_reuse_verdict(browser_key):
+                continue
+            with self.dirty_lock:
+                self.dirty_browsers.discard(browser_key)
+            to_scan.append(browser_key)
+        return plan, to_scan
 
+    def apply_check_results(self, plan, verdicts):
+        """Update per-browser state from this cycle's verdicts and trigger shutdown when confirmed."""
         browsers_found = []
         browsers_with_disabled_extension = []  # Track which browsers have disabled extension
         extension_disabled = False
         any_check_performed = False
-        
-        allowed_set = set(b.lower() for b in self.config['browsers'])
-        
-        if self.shutdown_in_progress is True:        
-            self.logger.debug(f"[CHECK CYCLE] Starting extension check (shutdown_in_progress={self.shutdown_in_progress})")
-        
-        for proc in psutil.process_iter(['pid', 'name', 'exe']):
-            try:
-                name_lower = (proc.info.get('name') or '').lower()
-                if not name_lower:
-                    continue
-                # self.logger.debug(f"Process seen: name={proc.info['name']} pid={proc.info['pid']} exe={proc.info['exe']}")
-                if name_lower in allowed_set:
-                    browsers_found.append({
-                        'name': proc.info['name'],
-                        'pid': proc.info['pid'],
-                        'exe': proc.info['exe']
-                    })
-                    
-                    extension_enabled = self.check_extension_status(proc.info['name'])
-                    any_check_performed = True
-                    browser_key = proc.info['name'].lower()
-                    
-                    if not extension_enabled:
-                        # Increment consecutive disabled count
-                        self.consecutive_disabled_counts[browser_key] = self.consecutive_disabled_counts.get(browser_key, 0) + 1
-                        count = self.consecutive_disabled_counts[browser_key]
-                        
-                        if count >= self.CONSECUTIVE_CHECKS_REQUIRED:
-                            extension_disabled = True
-                            browsers_with_disabled_extension.append(proc.info['name'])
-                            self.logger.warning(f"EXTENSION DISABLED in {proc.info['name']} (PID: {proc.info['pid']}) - confirmed after {count} consecutive checks")
-                        else:
-                            self.logger.debug(f"[CONSECUTIVE] {proc.info['name']} disabled check {count}/{self.CONSECUTIVE_CHECKS_REQUIRED} - waiting for confirmation")
-                    else:
-                        # Reset counter when extension is found enabled
-                        if browser_key in self.consecutive_disabled_counts and self.consecutive_disabled_counts[browser_key] > 0:
-                            self.logger.debug(f"[CONSECUTIVE] {proc.info['name']} now enabled - resetting counter (was {self.consecutive_disabled_counts[browser_key]})")
-                        self.consecutive_disabled_counts[browser_key] = 0
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+
+        for browser_key, procs in plan.items():
+            browser_name = procs[0]['name']
+            pids = [p['pid'] for p in procs]
+            browsers_found.extend({'name': p['name'], 'pid': p['pid'], 'exe': p['exe']} for p in procs)
+
+            if browser_key in verdicts:
+                extension_enabled = verdicts[browser_key]
+                self.extension_status[browser_key] = {
+                    'enabled': bool(extension_enabled),
+                    'pids': pids,
+                    'checked_at': time.time(),
+                }
+            else:
+                extension_enabled = self.extension_status[browser_key]['enabled']
+                self.extension_status[browser_key]['pids'] = pids
+            any_check_performed = True
+
+            if not extension_enabled:
+                # Increment consecutive disabled count
+                self.consecutive_disabled_counts[browser_key] = self.consecutive_disabled_counts.get(browser_key, 0) + 1
+                count = self.consecutive_disabled_counts[browser_key]
+
+                if count >= self.CONSECUTIVE_CHECKS_REQUIRED:
+                    extension_disabled = True
+                    browsers_with_disabled_extension.append(browser_name)
+                    self.logger.warning(f"EXTENSION DISABLED in {browser_name} ({len(pids)} process(es)) - confirmed after {count} consecutive checks",
+                                        extra={'repeat_key': ('disabled-confirmed', browser_key)})
+                else:
+                    self.logger.debug(f"[CONSECUTIVE] {browser_name} disabled check {count}/{self.CONSECUTIVE_CHECKS_REQUIRED} - waiting for confirmation")
+            else:
+                # Reset counter when extension is found enabled
+                if browser_key in self.consecutive_disabled_counts and self.consecutive_disabled_counts[browser_key] > 0:
+                    self.logger.debug(f"[CONSECUTIVE] {browser_name} now enabled - resetting counter (was {self.consecutive_disabled_counts[browser_key]})")
+                self.consecutive_disabled_counts[browser_key] = 0
+        self.browser_processes = browsers_found
+
         # Evaluate direct disabled indicators only as a fallback when no browser checks succeeded
         # This avoids stale marker files causing false positives.
         if not any_check_performed:
@@ -385,26 +2429,33 @@ class ExtensionGuardian:
                             f"Checks performed: {any_check_performed}, "
                             f"Extension disabled: {extension_disabled}")
 
-        # self.update_browser_status(browsers_found)
-        
         if extension_disabled and self.config['browser_close_enabled']:
             if self.recent_log_handler:
                 self.snapshot_anchor_line = self.recent_log_handler.get_latest_line_index() + 1
+            self.snapshot_anchor_time = time.time()
             self.logger.warning("EXTENSION DISABLED DETECTED - TRIGGERING BROWSER SHUTDOWN")
             if self.last_shutdown_time:
                 elapsed = (datetime.now() - self.last_shutdown_time).total_seconds()
                 if elapsed < 60:
                     self.logger.debug(f"Recent shutdown {elapsed:.1f}s ago, skipping")
                     return
+            self.journal_event('shutdown_triggered', browsers=sorted(set(browsers_with_disabled_extension)))
             self.save_log_snapshot("shutdown")
-            self.shutdown_in_progress = True
             if not self.extension_disabled_warning_shown:
                 self.extension_disabled_warning_shown = True
                 self.logger.warning("Starting shutdown sequence for disabled extension (no popup)")
             else:
                 self.logger.warning("Shutdown sequence already triggered; skipping duplicate notification")
-            threading.Thread(target=lambda: self.countdown_and_close_browsers(browsers_with_disabled_extension), daemon=True).start()
-        
+            if self.start_countdown(browsers_with_disabled_extension):
+                # Only once the countdown is scheduled; its finally block clears the flag again
+                self.shutdown_in_progress = True
+
+    def on_browser_process_event(self, event):
+        self.logger.info(f"Browser {event.kind}: {event.image} ({len(event.pids)} process(es))")
+        if event.kind == 'exited':
+            # Its PIDs are gone; force a fresh scan when the browser comes back
+            self.extension_status.pop(event.image, None)
+
     def check_direct_disabled_indicators(self):
         return False
     
@@ -412,85 +2463,207 @@ class ExtensionGuardian:
         # Popup disabled per user request; keep function for compatibility
         return
         
-    def countdown_and_close_browsers(self, affected_browsers):
+    def start_countdown(self, affected_browsers):
+        """Schedule the cancellable close countdown on the engine loop; False if monitoring has stopped."""
+        if self.monitoring_engine is None:
+            self.logger.warning("Monitoring is stopped - not starting the close countdown")
+            return False
+        self.countdown_browsers = sorted(set(affected_browsers))
+        try:
+            self.countdown_future = self.monitoring_engine.submit(self.countdown_and_close_browsers(affected_browsers))
+        except RuntimeError as e:
+            self.logger.warning(f"Could not start the close countdown: {e}")
+            return False
+        return True
+
+    def review_countdown(self, verdicts):
+        """Cancel the running countdown once the extension is enabled again in every affected browser."""
+        if verdicts and all(verdicts.values()):
+            self.logger.info(f"Extension enabled again in {', '.join(verdicts)} - cancelling countdown")
+            self.cancel_countdown()
+
+    def cancel_countdown(self):
+        future = self.countdown_future
+        if future is not None and not future.done():
+            future.cancel()
+
+    async def countdown_and_close_browsers(self, affected_browsers):
         countdown = self.config['warning_countdown_seconds']
         browser_list = ', '.join(set(affected_browsers))
         try:
             for i in range(countdown, 0, -1):
                 self.status_var.set(f"Closing {browser_list} in {i} seconds...")
                 self.logger.info(f"Closing {browser_list} in {i} seconds...")
-                time.sleep(1)
+                await asyncio.sleep(1)
             
-            self.close_specific_browsers(affected_browsers)
+            await asyncio.get_running_loop().run_in_executor(None, self.close_specific_browsers, affected_browsers)
             self.last_shutdown_time = datetime.now()
             
             self.status_var.set(f"Browsers closed - Extension disabled in {browser_list}")
             self.logger.info(f"Browsers closed - Extension disabled in {browser_list}")
+        except asyncio.CancelledError:
+            self.logger.warning(f"Countdown for {browser_list} cancelled")
+            self.journal_event('countdown_cancelled', browsers=sorted(set(affected_browsers)))
+            raise
         finally:
             # Reset the flag so future detections can trigger shutdown
             self.shutdown_in_progress = False
             self.extension_disabled_warning_shown = False
             self.logger.info("Shutdown sequence completed, monitoring will continue")
     
-    def close_all_browsers(self):
-        closed_total = 0
+    def take_process_snapshot(self):
+        """Refresh the process tracker once and return the resulting ProcessSnapshot."""
         allowed_set = set(b.lower() for b in self.config['browsers'])
-        seen_images = set()
-
-        for proc in psutil.process_iter(['pid', 'name']):
-            name_lower = (proc.info['name'] or '').lower()
-            if name_lower and name_lower in allowed_set and name_lower not in seen_images:
-                killed = kill_processes_for_exe(proc.info['name'], logger=self.logger)
-                closed_total += killed
-                seen_images.add(name_lower)
+        if self.process_tracker is None or self.process_tracker.watched_images != allowed_set:
+            self.process_tracker = ProcessTracker(allowed_set, on_event=self.on_browser_process_event)
+        self.process_tracker.resync_after = self.scheduler.idle_gap()
+        self.process_tracker.refresh()
+        self.process_snapshot = self.process_tracker.snapshot()
+        return self.process_snapshot
 
+    def close_all_browsers(self):
+        closed_total = self.close_images(self.config['browsers'])
         self.logger.info(f"Closed {closed_total} browser process(es)")
-    
+
     def close_specific_browsers(self, browser_names):
         """Close only the specific browsers that have the extension disabled."""
-        closed_total = 0
-        affected_set = set(b.lower() for b in browser_names)
-        seen_images = set()
-        
         self.logger.info(f"Closing only affected browsers: {', '.join(browser_names)}")
+        closed_total = self.close_images(browser_names)
+        self.logger.info(f"Closed {closed_total} process(es) for affected browsers only")
 
-        for proc in psutil.process_iter(['pid', 'name']):
-            name_lower = (proc.info['name'] or '').lower()
-            if name_lower and name_lower in affected_set and name_lower not in seen_images:
-                killed = kill_processes_for_exe(proc.info['name'], logger=self.logger)
-                closed_total += killed
-                seen_images.add(name_lower)
+    def close_images(self, images):
+        """Kill all processes of the given browser images using a single process snapshot.
 
-        self.logger.info(f"Closed {closed_total} process(es) for affected browsers only")
+        The snapshot is a fresh enumeration rather than the tracker's view, so a
+        browser process on a recycled PID the tracker has not re-resolved yet is
+        killed too.
+        """
+        snapshot = ProcessSnapshot.capture()
+        closed_total = 0
+        for image in sorted(set(i.lower() for i in images)):
+            if image in snapshot.by_image:
+                killed = kill_processes_for_exe(image, logger=self.logger, snapshot=snapshot)
+                closed_total += killed
+                self.journal_event('processes_killed', browser=image, count=killed)
+        return closed_total
 
     def update_browser_status(self, browsers):
         for browser in browsers:
             self.logger.info(f"Browser running: {browser['name']} (PID: {browser['pid']})")
     
-    def quick_check_all_browsers(self):
-        """Check extension status in all 4 browsers and display results"""
-        results = []
-        browsers = [
-            ('Chrome', 'chrome.exe'),
-            ('Edge', 'msedge.exe'),
-            ('Brave', 'brave.exe'),
-            ('Comet', 'comet.exe')
-        ]
-        
-        for browser_name, browser_exe in browsers:
-            status = self.check_extension_status(browser_exe)
-            status_text = "✓ ENABLED" if status else "✗ DISABLED"
-            results.append(f"{browser_name}: {status_text}")
-        
-        result_msg = " | ".join(results)
-        self.check_result_var.set(result_msg)
+    QUICK_CHECK_BROWSERS = [(spec.label, spec.image) for spec in BROWSER_CATALOG]
+
+    async def quick_check_async(self):
+        """Check extension status in all 4 browsers concurrently, publishing progress as each finishes.
+
+        A browser whose monitor verdict is still fresh (see fresh_verdict) is not rescanned.
+        Returns [(label, enabled, source, states)] where source is 'cached' or 'scanned'
+        and states are the ExtensionStates behind the verdict.
+        """
+        loop = asyncio.get_running_loop()
+        results = {}
+
+        async def check_one(browser_name, browser_exe):
+            cached = self.fresh_verdict(browser_exe)
+            if cached is not None:
+                results[browser_name] = (cached['enabled'], 'cached', self.extension_states.get(browser_exe, ()))
+            else:
+                status, states = await loop.run_in_executor(None, self.check_extension_states, browser_exe)
+                results[browser_name] = (status, 'scanned', states)
+            self.ui.set('check_result', self.format_quick_check(results))
+
+        self.ui.set('check_result', self.format_quick_check(results))
+        await asyncio.gather(*(check_one(name, exe) for name, exe in self.QUICK_CHECK_BROWSERS))
+        return [(name,) + results[name] for name, _ in self.QUICK_CHECK_BROWSERS]
+
+    def format_quick_check(self, results):
+        parts = []
+        for browser_name, _ in self.QUICK_CHECK_BROWSERS:
+            if browser_name not in results:
+                parts.append(f"{browser_name}: checking...")
+                continue
+            status, source, states = results[browser_name]
+            suffix = " (recent)" if source == 'cached' else ""
+            blocking = next((ext_state for ext_state in states if ext_state.is_blocking), None)
+            if not status and blocking is not None:
+                suffix = f" ({blocking.describe()}){suffix}"
+            parts.append(f"{browser_name}: {'✓ ENABLED' if status else '✗ DISABLED'}{suffix}")
+        return " | ".join(parts)
+
+    async def run_quick_check(self):
+        try:
+            results = await self.quick_check_async()
+        except Exception as e:
+            self.ui.set('check_result', f"Check failed: {e}")
+            self.logger.error(f"Quick check failed: {e}")
+            return
+        finally:
+            self.quick_check_running = False
+        result_msg = self.format_quick_check({name: result for name, *result in results})
         self.logger.info(f"Quick check results: {result_msg}")
-    
+
+    def quick_check_all_browsers(self):
+        """Check extension status in all 4 browsers off the Tk thread; results appear as they arrive."""
+        if self.quick_check_running:
+            return
+        self.quick_check_running = True
+        if self.monitoring_engine is not None and self.monitoring_engine.is_running:
+            try:
+                self.monitoring_engine.submit(self.run_quick_check())
+            except RuntimeError as e:
+                # The engine stopped after the is_running check; run_quick_check's finally never runs
+                self.quick_check_running = False
+                self.logger.error(f"Quick check could not be scheduled: {e}")
+                self.ui.set('check_result', f"Check failed: {e}")
+        else:
+            threading.Thread(target=asyncio.run, args=(self.run_quick_check(),), daemon=True).start()
+
+    def fresh_verdict(self, browser_key):
+        """The monitor's last status entry for browser_key, or None if it is missing or may be stale."""
+        previous = self.extension_status.get(browser_key)
+        if previous is None:
+            return None
+        if self._can_reuse_verdict(browser_key):
+            return previous
+        with self.dirty_lock:
+            if browser_key in self.dirty_browsers:
+                return None
+        if time.time() - previous['checked_at'] < self.QUICK_CHECK_MAX_AGE:
+            return previous
+        return None
+
+    def pump_ui_updates(self, interval_ms=100):
+        """Apply queued UI updates on the Tk thread: the latest status and one batched log insert."""
+        values, lines, dropped = self.ui.drain()
+        if 'status' in values:
+            self.status_tk_var.set(values['status'])
+        if 'check_result' in values:
+            self.check_result_var.set(values['check_result'])
+        if values.get('show_window'):
+            self.root.deiconify()
+            self.root.lift()
+            self.root.focus_force()
+        if dropped:
+            lines.insert(0, f"... {dropped} line(s) skipped ...")
+        if lines:
+            follow = self.log_text.yview()[1] >= 1.0  # Only autoscroll if already at the bottom
+            self.log_text.configure(state='normal')
+            self.log_text.insert('end', '\n'.join(lines) + '\n')
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - self.ACTIVITY_LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete('1.0', f'{excess + 1}.0')
+            self.log_text.configure(state='disabled')
+            if follow:
+                self.log_text.see('end')
+        self.root.after(interval_ms, self.pump_ui_updates, interval_ms)
+
     def view_logs(self):
         log_dir = Path.home() / "ExtensionGuardian" / "logs"
         os.startfile(str(log_dir))
 
     def manual_save_log_snapshot(self):
+        from tkinter import messagebox
+
         snapshot_path = self.save_log_snapshot("manual")
         if snapshot_path:
             messagebox.showinfo("Logs Saved", f"Snapshot saved to:\n{snapshot_path}")
@@ -513,16 +2686,26 @@ class ExtensionGuardian:
             if not log_lines:
                 self.logger.warning("No log lines found since anchor point for shutdown snapshot.")
                 return None
+            # Transitions leading up to the shutdown (the disable was seen a few cycles before the anchor)
+            events_since = (self.snapshot_anchor_time or time.time()) - 3600
         else:
             log_lines = self.recent_log_handler.get_all_lines()
             if not log_lines:
                 self.logger.warning("No log lines available in buffer for manual snapshot.")
                 return None
+            events_since = time.time() - 24 * 3600
+        events = self.journal.query(since=events_since)
+        if events:
+            log_lines = (["--- State transitions ---"] + [format_event(e) for e in events]
+                         + ["--- Log ---"] + log_lines)
         
         try:
             with open(snapshot_path, 'w', encoding='utf-8') as f:
                 f.write('\n'.join(log_lines))
             self.logger.info(f"Log snapshot saved: {snapshot_path} ({len(log_lines)} lines)")
+            # Left as plain text for the user to open; archive_stale_logs() compresses it on the
+            # next start, and retention still counts it against the budget now
+            self.log_archiver.submit()
             return snapshot_path
         except Exception as e:
             self.logger.error(f"Failed to save log snapshot: {e}")
@@ -539,15 +2722,29 @@ class ExtensionGuardian:
         self.config['monitoring_enabled'] = True
         self.config['browser_close_enabled'] = True
         # Enforce the supported Chromium browsers only (remove Firefox etc.)
-        self.config['browsers'] = ['chrome.exe', 'msedge.exe', 'brave.exe', 'comet.exe']
-        # Always enforce 1s check interval
-        self.config['check_interval_seconds'] = 1
+        self.config['browsers'] = list(BROWSER_IMAGES)
+        # Active check interval is between 1s and 5s; idle back-off stays between that and 5 minutes
+        self.config['check_interval_seconds'] = min(5, max(1, int(self.config.get('check_interval_seconds', 1))))
+        self.config['idle_interval_max_seconds'] = min(300, max(self.config['check_interval_seconds'],
+                                                                int(self.config.get('idle_interval_max_seconds', 30))))
+        self.config['log_buffer_max_lines'] = max(100, int(self.config.get('log_buffer_max_lines', 5000)))
+        self.config['log_buffer_max_bytes'] = max(64 * 1024, int(self.config.get('log_buffer_max_bytes', 2 * 1024 * 1024)))
+        self.config['log_max_file_mb'] = min(100, max(1, int(self.config.get('log_max_file_mb', 10))))
+        self.config['log_retention_mb'] = max(self.config['log_max_file_mb'] * 2, int(self.config.get('log_retention_mb', 200)))
+        self.config['extra_extension_ids'] = [
+            ext_id for ext_id in self.config.get('extra_extension_ids', [])
+            if isinstance(ext_id, str) and _EXTENSION_ID_PATTERN.fullmatch(ext_id)
+        ]
         if int(self.config.get('warning_countdown_seconds', 15)) < 15:
             self.config['warning_countdown_seconds'] = 15
         # Always enforce the forced extension ID regardless of saved config
         self.config['extension_id'] = self.FORCED_EXTENSION_ID
         
     def ensure_startup_registration(self):
+        if winreg is None:
+            self.logger.debug("Startup registration skipped (no Windows registry)")
+            return
+
         run_key_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
         value_name = "ExtensionGuardianDesktop"
 
@@ -562,6 +2759,7 @@ class ExtensionGuardian:
             else:
                 exe_path = f"{sys.executable} \"{Path(__file__).resolve()}\""
 
+        # Starts tray-only; tkinter and the window are only loaded on the first "Show Window"
         command = f'"{exe_path}" --background'
 
         if hasattr(winreg, "KEY_WOW64_64KEY"):
@@ -587,217 +2785,285 @@ class ExtensionGuardian:
         if not hasattr(self, 'icon'):
             self.create_system_tray()
         
-        if not self.is_monitoring:
-            self.is_monitoring = True
-            self.monitoring_thread = threading.Thread(target=self.continue_background_monitoring, daemon=True)
-            self.monitoring_thread.start()
+        self.start_monitoring()
     
     def create_system_tray(self):
+        import pystray
+        from PIL import Image
+
         img = Image.new('RGB', (64, 64), color='red')
         menu = pystray.Menu(
-            pystray.MenuItem("Show Window", self.show_window)
+            pystray.MenuItem("Show Window", self.show_window),
+            pystray.MenuItem("Check Now", self.check_now)
         )
         self.icon = pystray.Icon("Extension Guardian", img, menu=menu)
         threading.Thread(target=self.icon.run, daemon=True).start()
         self.logger.info("System tray icon created successfully")
 
     def show_window(self):
-        self.root.deiconify()
-        self.root.lift()
-        self.root.focus_force()
+        # Called from the tray thread; the Tk thread shows the window on its next pump,
+        # and on the first call run() builds the window
+        self.ui.set('show_window', True)
+        self.show_requested.set()
+
+    def next_wait_interval(self):
+        interval = self.scheduler.next_interval(self.needs_fast_polling())
+        if time.monotonic() - self.last_scheduler_report >= 3600:
+            self.last_scheduler_report = time.monotonic()
+            stats = self.scheduler.stats()
+            self.logger.info(
+                f"[SCHEDULER] {stats['cycles_per_hour']:.0f} cycles/h, "
+                f"{stats['cpu_seconds_per_hour']:.1f} CPU s/h, current interval {stats['current_interval']:.0f}s"
+            )
+        return interval
+
+    def needs_fast_polling(self):
+        """True while a watched browser runs, a shutdown is pending or a profile is mid-transition."""
+        if self.shutdown_in_progress:
+            return True
+        if self.process_snapshot is not None and len(self.process_snapshot) > 0:
+            return True
+        if any(count > 0 for count in self.consecutive_disabled_counts.values()):
+            return True
+        with self.dirty_lock:
+            return bool(self.dirty_browsers)
+
+    def start_change_source(self):
+        """Create the change source (once) and watch every configured browser's User Data directories."""
+        if self.change_source is None:
+            self.change_source = create_change_source(self.logger)
+            self.logger.info(f"Watching profile changes with {type(self.change_source).__name__}")
+        watched = []
+        for browser in self.config['browsers']:
+            watched.extend(self.get_user_data_paths(browser) or [])
+        self.change_source.watch(watched)
+        return self.change_source
+
+    def interrupt_profile_wait(self):
+        if self.change_source is not None:
+            self.change_source.interrupt()
+
+    def wait_for_profile_changes(self, timeout):
+        """Block until a watched profile file changes or timeout expires; marks affected browsers dirty.
+
+        Dirtiness is tracked per browser rather than per profile. The rescan still only
+        reads the profile that changed: every other profile's Preferences has an unchanged
+        stat signature and is answered by PreferencesCache, so it costs one stat.
+        """
+        try:
+            source = self.change_source or self.start_change_source()
+            changed = source.wait(timeout)
+        except Exception as e:
+            self.logger.error(f"Change source failed, falling back to polling: {e}")
+            if self.change_source is not None:
+                self.change_source.close()
+            self.change_source = PollingChangeSource()
+            self.start_change_source()
+            return set()
+        if changed:
+            self.scheduler.wake()
+            affected = self.browsers_for_paths(changed)
+            self.logger.debug(f"[WATCH] Profile changes for {sorted(affected)}: {len(changed)} path(s)")
+            with self.dirty_lock:
+                self.dirty_browsers.update(affected)
+        return changed
+
+    def browsers_for_paths(self, paths):
+        """Map changed file paths (or User Data roots) to the browser images that own them."""
+        affected = set()
+        normalized = [os.path.normcase(os.path.normpath(p)) for p in paths]
+        for browser in self.config['browsers']:
+            for base in self.get_user_data_paths(browser) or []:
+                root = os.path.normcase(os.path.normpath(base))
+                if any(p == root or p.startswith(root + os.sep) for p in normalized):
+                    affected.add(browser.lower())
+                    break
+        return affected
+
+    def _can_reuse_verdict(self, browser_key):
+        """A previous verdict stays valid while change events are flowing and none touched this browser."""
+        previous = self.extension_status.get(browser_key)
+        if previous is None or self.change_source is None:
+            return False
+        if time.time() - previous['checked_at'] >= self.FULL_RESCAN_SECONDS:
+            return False
+        with self.dirty_lock:
+            return browser_key not in self.dirty_browsers
+
+    def get_user_data_paths(self, browser_name):
+        """Return the User Data directories for a browser image, or None if unknown."""
+        table = getattr(self, 'user_data_table', None) or browser_user_data_table()
+        return table.get(browser_name.lower())
 
-    def continue_background_monitoring(self):
-        while self.is_monitoring:
-            self.check_browsers_and_extensions()
-            time.sleep(1)
+    def guarded_extension_ids(self):
+        """The forced extension ID followed by any extra IDs from config, without duplicates."""
+        return list(dict.fromkeys([self.config['extension_id']] + list(self.config.get('extra_extension_ids', []))))
 
     def check_extension_status(self, browser_name):
-        browser_name_lower = browser_name.lower()
-        extension_id = self.config['extension_id']
-
-        # Support multiple channels (stable/beta/dev/canary) and any profile folder that has a Preferences file
-        def _candidate_paths(paths):
-            return [os.path.expandvars(p) for p in paths]
-
-        base_paths = []
-        if 'chrome.exe' in browser_name_lower:
-            base_paths = _candidate_paths([
-                r"%LOCALAPPDATA%\Google\Chrome\User Data",
-                r"%LOCALAPPDATA%\Google\Chrome Beta\User Data",
-                r"%LOCALAPPDATA%\Google\Chrome SxS\User Data",
-            ])
-        elif 'msedge.exe' in browser_name_lower:
-            base_paths = _candidate_paths([
-                r"%LOCALAPPDATA%\Microsoft\Edge\User Data",
-                r"%LOCALAPPDATA%\Microsoft\Edge Beta\User Data",
-                r"%LOCALAPPDATA%\Microsoft\Edge Dev\User Data",
-                r"%LOCALAPPDATA%\Microsoft\Edge SxS\User Data",
-            ])
-        elif 'brave.exe' in browser_name_lower:
-            base_paths = _candidate_paths([
-                r"%LOCALAPPDATA%\BraveSoftware\Brave-Browser\User Data",
-                r"%LOCALAPPDATA%\BraveSoftware\Brave-Browser-Beta\User Data",
-                r"%LOCALAPPDATA%\BraveSoftware\Brave-Browser-Dev\User Data",
-            ])
-        elif 'comet.exe' in browser_name_lower:
-            base_paths = _candidate_paths([
-                r"%LOCALAPPDATA%\Perplexity\Comet\User Data",
-                r"%APPDATA%\Perplexity\Comet\User Data",
-            ])
-        else:
+        """True only if every guarded extension is enabled; all IDs share one read per Preferences file."""
+        return self.check_extension_states(browser_name)[0]
+
+    def check_extension_states(self, browser_name):
+        """Return (status, states): check_extension_status's verdict and the ExtensionState records behind it.
+
+        The states are also kept in extension_states so the quick check and the
+        diagnostics can explain a verdict without reading Preferences again.
+        """
+        base_paths = self.get_user_data_paths(browser_name)
+        if base_paths is None:
             self.logger.warning(f"Unknown browser: {browser_name}")
-            return False
+            return False, ()
 
+        status = None
+        states = []
+        pending = self.guarded_extension_ids()
         for base_path in base_paths:
-            status = self._scan_profiles_for_ext_status(base_path, extension_id, self.logger)
-            if status is True:
-                return True
+            results = self.scan_profiles_for_extensions(base_path, pending, self.logger, browser_name)
+            for extension_id in list(pending):
+                if results:
+                    states.extend(results[extension_id])
+                verdict = self._summarize_ext_status(base_path, extension_id,
+                                                     results and results[extension_id], self.logger)
+                if verdict is False:
+                    status = False
+                elif verdict is True:
+                    pending.remove(extension_id)
             # If explicitly False (found disabled), stop early.
             if status is False:
-                return False
-        return False
+                break
+            if not pending:
+                status = True
+                break
+        status = bool(status)
+        states = tuple(states)
+        self.extension_states[browser_name.lower()] = states
+        return status, states
     
-    def _scan_profiles_for_ext_status(self, base_user_data_path, extension_id, logger):
-        """Return True if extension is enabled (incognito/private allowed) across profiles; False if disabled/blocked."""
-        enabled_candidate = False
-        found_any = False
-        profiles_checked = 0
-        profiles_skipped_due_to_errors = 0
+    def journal_event(self, kind, **fields):
+        journal = getattr(self, 'journal', None)
+        if journal is None:
+            return
+        try:
+            event = journal.append(kind, **fields)
+        except OSError as e:
+            self.logger.debug(f"[JOURNAL] Could not record {kind}: {e}")
+            return
+        if self.root is not None:
+            self.ui.append_line(format_event(event))
+
+    def note_profile_state(self, browser_name, base_user_data_path, profile, profile_state, extension_id=None, **details):
+        """Journal a profile's extension state when it differs from the last one seen."""
+        if browser_name is None or getattr(self, 'journal', None) is None:
+            return
+        extension_id = extension_id or self.FORCED_EXTENSION_ID
+        if extension_id != self.FORCED_EXTENSION_ID:
+            details['extension'] = extension_id
+        key = (browser_name.lower(), base_user_data_path, profile, extension_id)
+        with self.profile_states_lock:
+            previous = self.profile_states.get(key)
+            if previous == profile_state:
+                return
+            self.profile_states[key] = profile_state
+        self.journal_event(self.PROFILE_STATE_EVENTS[profile_state], browser=key[0], profile=profile,
+                           previous=previous, user_data=base_user_data_path, **details)
+
+    PROFILE_STATE_EVENTS = {
+        ExtensionState.ENABLED: 'extension_enabled',
+        ExtensionState.DISABLED: 'extension_disabled',
+        ExtensionState.DISABLE_REASONS: 'extension_disabled',
+        ExtensionState.INCOGNITO_REVOKED: 'incognito_revoked',
+        ExtensionState.MISSING: 'extension_missing',
+    }
+
+    def scan_profiles_for_extensions(self, base_user_data_path, extension_ids, logger, browser_name=None):
+        """Return {extension_id: [ExtensionState, ...]} for every profile, or None if the directory is missing.
 
+        Each profile's Preferences file is read once for all requested IDs; a file
+        that could not be read yields a LOCKED or UNREADABLE state for every ID.
+        """
         if not os.path.isdir(base_user_data_path):
             logger.debug(f"[SCAN] Base path missing: {base_user_data_path}")
             return None
 
-        for name in os.listdir(base_user_data_path):
-            # Handle snapshot-based profiles (Edge/Brave keep snapshots under User Data/Snapshots/<ver>/<profile>)
-            if name.lower() == 'snapshots':
-                snapshots_root = os.path.join(base_user_data_path, name)
-                for ver in os.listdir(snapshots_root):
-                    ver_dir = os.path.join(snapshots_root, ver)
-                    if not os.path.isdir(ver_dir):
-                        continue
-                    for prof in os.listdir(ver_dir):
-                        profile_dir = os.path.join(ver_dir, prof)
-                        if not os.path.isdir(profile_dir):
-                            continue
-                        prefs_path = os.path.join(profile_dir, 'Preferences')
-                        if not os.path.isfile(prefs_path):
-                            continue
+        browser = browser_name.lower() if browser_name else None
+        extension_ids = list(dict.fromkeys(extension_ids))
+        results = {ext_id: [] for ext_id in extension_ids}
+        for record in iter_profile_records(base_user_data_path, self.local_state_profiles):
+            kind = 'Snapshot' if record.is_snapshot else 'Profile'
+            where = f"{kind.lower()} '{record.name}'"
 
-                        profiles_checked += 1
-                        try:
-                            with open(prefs_path, 'r', encoding='utf-8') as f:
-                                prefs_json = json.load(f)
-                            ext_data = prefs_json.get('extensions', {}).get('settings', {}).get(extension_id)
-                            if not ext_data:
-                                logger.debug(f"[SCAN] Extension {extension_id} not found in snapshot profile '{prof}'")
-                                continue
-
-                            found_any = True
-                            state_val = ext_data.get('state')
-                            incog_val = ext_data.get('incognito')
-                            allow_incog = ext_data.get('allow_in_incognito')
-                            disable_reasons = ext_data.get('disable_reasons', [])
-                            if disable_reasons:
-                                logger.info(
-                                    f"[SCAN] Snapshot profile '{prof}': state={state_val}, incognito={incog_val}, "
-                                    f"allow_in_incognito={allow_incog}, disable_reasons={disable_reasons}"
-                                )
-
-                            if state_val == 0:
-                                logger.warning(f"[SCAN FALSE] Extension {extension_id} DISABLED (state=0) in snapshot '{prof}'")
-                                return False
-
-                            if disable_reasons:
-                                logger.warning(
-                                    f"[SCAN FALSE] Extension {extension_id} DISABLED (disable_reasons={disable_reasons}) "
-                                    f"in snapshot '{prof}'"
-                                )
-                                return False
-
-                            if not _is_incognito_allowed(ext_data):
-                                logger.warning(
-                                    f"[SCAN FALSE] Extension {extension_id} not allowed in private/incognito in snapshot '{prof}' "
-                                    f"(incognito={incog_val}, allow_in_incognito={allow_incog})"
-                                )
-                                return False
-
-                            enabled_candidate = True
-                        except PermissionError:
-                            profiles_skipped_due_to_errors += 1
-                            logger.debug(f"[SCAN] Preferences locked by browser for snapshot '{prof}' - skipping this check")
-                            continue
-                        except Exception as e:
-                            profiles_skipped_due_to_errors += 1
-                            logger.debug(f"[SCAN] Error reading Preferences for snapshot '{prof}': {e}")
-                            continue
-                # done with snapshots; move to next top-level entry
+            try:
+                entries = self.prefs_cache.get_extension_entries(record.prefs_path, extension_ids, st=record.prefs_stat)
+            except PermissionError:
+                logger.debug(f"[SCAN] Preferences locked by browser for {where} - skipping this check")
+                for ext_id in extension_ids:
+                    results[ext_id].append(ExtensionState.from_error(browser, record, ext_id, ExtensionState.LOCKED))
                 continue
-
-            profile_dir = os.path.join(base_user_data_path, name)
-            if not os.path.isdir(profile_dir):
+            except Exception as e:
+                logger.debug(f"[SCAN] Error reading Preferences for {where}: {e}")
+                for ext_id in extension_ids:
+                    results[ext_id].append(ExtensionState.from_error(browser, record, ext_id, ExtensionState.UNREADABLE))
                 continue
 
-            prefs_path = os.path.join(profile_dir, 'Preferences')
-            if not os.path.isfile(prefs_path):
-                continue
+            for ext_id in extension_ids:
+                ext_data = entries[ext_id]
+                ext_state = ExtensionState.from_entry(browser, record, ext_id, ext_data)
+                self._log_extension_state(ext_state, ext_data, kind, logger)
+                results[ext_id].append(ext_state)
+                details = {}
+                if ext_state.reason == ExtensionState.DISABLED:
+                    details['state'] = 0
+                elif ext_state.reason == ExtensionState.DISABLE_REASONS:
+                    details['disable_reasons'] = list(ext_state.disable_reasons)
+                self.note_profile_state(browser_name, base_user_data_path, record.name, ext_state.reason,
+                                        extension_id=ext_id, **details)
+        return results
+
+    def _log_extension_state(self, ext_state, ext_data, kind, logger):
+        extension_id = ext_state.extension_id
+        where = f"{kind.lower()} '{ext_state.profile}'"
+        if ext_state.reason == ExtensionState.MISSING:
+            logger.debug(f"[SCAN] Extension {extension_id} not found in {where}")
+            return
 
-            profiles_checked += 1
+        incog_val = ext_data.get('incognito')
+        allow_incog = ext_data.get('allow_in_incognito')
+        disable_reasons = ext_data.get('disable_reasons', [])
+        if disable_reasons:
+            logger.info(
+                f"[SCAN] {kind} '{ext_state.profile}': state={ext_state.state}, incognito={incog_val}, "
+                f"allow_in_incognito={allow_incog}, disable_reasons={disable_reasons}"
+            )
 
-            try:
-                with open(prefs_path, 'r', encoding='utf-8') as f:
-                    prefs = json.load(f)
-                ext_data = prefs.get('extensions', {}).get('settings', {}).get(extension_id)
-                if not ext_data:
-                    logger.debug(f"[SCAN] Extension {extension_id} not found in profile '{name}'")
-                    continue
+        if ext_state.reason == ExtensionState.DISABLED:
+            logger.warning(f"[SCAN FALSE] Extension {extension_id} DISABLED (state=0) in {where}")
+        elif ext_state.reason == ExtensionState.DISABLE_REASONS:
+            logger.warning(
+                f"[SCAN FALSE] Extension {extension_id} DISABLED (disable_reasons={disable_reasons}) "
+                f"in {where}"
+            )
+        elif ext_state.reason == ExtensionState.INCOGNITO_REVOKED:
+            logger.warning(
+                f"[SCAN FALSE] Extension {extension_id} not allowed in private/incognito in {where} "
+                f"(incognito={incog_val}, allow_in_incognito={allow_incog})"
+            )
 
-                found_any = True
-                state_val = ext_data.get('state')
-                incog_val = ext_data.get('incognito')
-                allow_incog = ext_data.get('allow_in_incognito')
-                disable_reasons = ext_data.get('disable_reasons', [])
-                if disable_reasons:
-                    logger.info(
-                        f"[SCAN] Profile '{name}': state={state_val}, incognito={incog_val}, "
-                        f"allow_in_incognito={allow_incog}, disable_reasons={disable_reasons}"
-                    )
-
-                if state_val == 0:
-                    logger.warning(f"[SCAN FALSE] Extension {extension_id} DISABLED (state=0) in profile '{name}'")
-                    return False
-
-                if disable_reasons:
-                    logger.warning(
-                        f"[SCAN FALSE] Extension {extension_id} DISABLED (disable_reasons={disable_reasons}) "
-                        f"in profile '{name}'"
-                    )
-                    return False
-
-                if not _is_incognito_allowed(ext_data):
-                    logger.warning(
-                        f"[SCAN FALSE] Extension {extension_id} not allowed in private/incognito in profile '{name}' "
-                        f"(incognito={incog_val}, allow_in_incognito={allow_incog})"
-                    )
-                    return False
-
-                enabled_candidate = True
-            except PermissionError:
-                profiles_skipped_due_to_errors += 1
-                logger.debug(f"[SCAN] Preferences locked by browser for profile '{name}' - skipping this check")
-                continue
-            except Exception as e:
-                profiles_skipped_due_to_errors += 1
-                logger.debug(f"[SCAN] Error reading Preferences for profile '{name}': {e}")
-                continue
+    def _summarize_ext_status(self, base_user_data_path, extension_id, states, logger):
+        """Reduce one extension's ExtensionStates to True (enabled), False (disabled/blocked) or None (not found)."""
+        if states is None:
+            return None
+        if any(ext_state.is_blocking for ext_state in states):
+            return False
 
+        profiles_checked = len(states)
+        profiles_skipped_due_to_errors = sum(1 for ext_state in states if ext_state.is_error)
         # RACE CONDITION FIX: If all profiles were skipped due to file locks/errors,
         # assume extension is still enabled (don't trigger false positive shutdown)
         if profiles_checked > 0 and profiles_skipped_due_to_errors == profiles_checked:
             logger.debug(f"[SCAN SKIP] All {profiles_checked} profile(s) had file access errors - assuming extension is OK")
             return True
 
-        if not found_any:
+        if not any(ext_state.is_enabled for ext_state in states):
             # Only treat as "not found" if we actually checked profiles successfully
             if profiles_skipped_due_to_errors > 0:
                 logger.debug(f"[SCAN SKIP] Extension not found but {profiles_skipped_due_to_errors} profile(s) had errors - assuming OK")
@@ -805,17 +3071,36 @@ class ExtensionGuardian:
             logger.warning(f"[SCAN FALSE] Extension {extension_id} not present in any profile under {base_user_data_path}")
             return None
 
-        return enabled_candidate
-    
+        return True
+
     def run(self):
-        self.root.withdraw()
+        """Run from the tray; the Tk window is only built once "Show Window" is first used."""
         self.create_system_tray()
         
-        self.monitoring_thread = threading.Thread(target=self.continue_background_monitoring, daemon=True)
-        self.monitoring_thread.start()
+        self.start_monitoring()
         
+        # Wake periodically so Ctrl+C is still delivered on Windows
+        while not self.show_requested.wait(1):
+            pass
+        self.setup_gui()
         self.root.mainloop()
 
+    def run_headless(self):
+        """Monitor without any window or tray until SIGINT/SIGTERM."""
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda signum, frame: stop.set())
+        self.start_monitoring()
+        self.logger.info("Running headless (no window or tray)")
+        # Wake periodically so Ctrl+C is still delivered on Windows
+        while not stop.wait(1):
+            pass
+        self.stop_monitoring()
+        self.logger.info("Headless monitor stopped")
+
 if __name__ == "__main__":
-    app = ExtensionGuardian(background_mode=True)
-    app.run()
\ No newline at end of file
+    if '--daemon' in sys.argv[1:]:
+        ExtensionGuardian(headless=True).run_headless()
+    else:
+        app = ExtensionGuardian(background_mode=True)
+        app.run()
\ No newline at end of file
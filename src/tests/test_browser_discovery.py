@@ -0,0 +1,102 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+def touch(*parts):
+    path = os.path.join(*parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+    return os.path.normpath(path)
+
+
+class IterBrowserExecutablesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_catalog_images_and_known_helpers_match(self):
+        app_dir = os.path.join(self.root, 'Google', 'Chrome', 'Application')
+        expected = {touch(app_dir, 'chrome.exe'), touch(app_dir, 'chrome_proxy.exe'),
+                    touch(self.root, 'Microsoft', 'Edge', 'Application', 'MSEDGE.EXE')}
+        for name in ('knowledge.exe', 'pledge.exe', 'msedgewebview2.exe', 'chrome_elf.dll', 'setup.exe'):
+            touch(app_dir, name)
+        touch(self.root, 'Tools', 'EdgeCase', 'edgecase.exe')
+        self.assertEqual(set(guardian.iter_browser_executables(self.root)), expected)
+
+    def test_stops_at_max_depth(self):
+        shallow = touch(self.root, 'a', 'b', 'c', 'brave.exe')
+        touch(self.root, 'a', 'b', 'c', 'd', 'comet.exe')
+        self.assertEqual(list(guardian.iter_browser_executables(self.root, max_depth=3)), [shallow])
+
+
+class DiscoveryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, 'ProgramFiles')
+        self.index_path = os.path.join(self.tmp.name, 'discovery_index.json')
+        self.chrome = touch(self.root, 'Google', 'Chrome', 'Application', 'chrome.exe')
+        touch(self.root, 'Vendor', 'Tool', 'tool.exe')
+        # Back-date every directory so any later change is sure to move its mtime
+        for dirpath, _, _ in os.walk(self.root):
+            os.utime(dirpath, (1_000_000_000, 1_000_000_000))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def refresh(self, index):
+        found = sorted(index.refresh_root(self.root))
+        stats, index.stats = index.stats, {'reused': 0, 'listed': 0}
+        return found, stats
+
+    def test_reloaded_index_reuses_unchanged_directories(self):
+        index = guardian.DiscoveryIndex.load(self.index_path)
+        self.assertEqual(self.refresh(index), ([self.chrome], {'reused': 0, 'listed': 6}))
+        self.assertTrue(index.save())
+        self.assertFalse(index.save())  # Nothing changed since
+
+        index = guardian.DiscoveryIndex.load(self.index_path)
+        self.assertEqual(self.refresh(index), ([self.chrome], {'reused': 6, 'listed': 0}))
+        self.assertFalse(index.dirty)
+
+    def test_only_changed_directories_are_listed_again(self):
+        index = guardian.DiscoveryIndex.load(self.index_path)
+        self.refresh(index)
+        edge = touch(self.root, 'Microsoft', 'Edge', 'Application', 'msedge.exe')
+        # Root (new Microsoft dir) is re-listed, plus the three new directories below it
+        self.assertEqual(self.refresh(index), (sorted([self.chrome, edge]), {'reused': 5, 'listed': 4}))
+        self.assertTrue(index.dirty)
+
+        os.remove(self.chrome)
+        found, stats = self.refresh(index)
+        self.assertEqual((found, stats['listed']), ([edge], 1))
+
+    def test_outdated_or_unreadable_index_starts_empty(self):
+        index = guardian.DiscoveryIndex.load(self.index_path)
+        self.refresh(index)
+        index.save()
+        self.assertEqual(guardian.DiscoveryIndex.load(self.index_path, max_depth=2).dirs, {})
+        with open(self.index_path, 'r+', encoding='utf-8') as f:
+            data = json.load(f)
+            data['version'] = guardian.DiscoveryIndex.VERSION - 1
+            f.seek(0)
+            f.truncate()
+            json.dump(data, f)
+        self.assertEqual(guardian.DiscoveryIndex.load(self.index_path).dirs, {})
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            f.write('{"version": ')
+        self.assertEqual(guardian.DiscoveryIndex.load(self.index_path).dirs, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
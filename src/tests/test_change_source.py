@@ -0,0 +1,129 @@
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+EXT_ID = 'cefohabdfmncmcilofdoodoaibcaakbc'
+PROFILES = ('Default', 'Profile 1')
+
+
+def make_user_data(root):
+    with open(os.path.join(root, 'Local State'), 'w', encoding='utf-8') as f:
+        json.dump({'profile': {'info_cache': {name: {} for name in PROFILES}}}, f)
+    for name in PROFILES:
+        os.makedirs(os.path.join(root, name))
+        write_preferences(root, name, state=1)
+
+
+def write_preferences(root, profile, state):
+    """Rewrite Preferences the way Chromium does: write a temp file, then rename it over the old one."""
+    path = os.path.join(root, profile, 'Preferences')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'extensions': {'settings': {EXT_ID: {'state': state, 'incognito': True}}}}, f)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def write_later(action, delay=0.1):
+    timer = threading.Timer(delay, action)
+    timer.start()
+    return timer
+
+
+class ChangeSourceContract:
+    """Behaviour every PreferencesChangeSource backend must show on a fake User Data tree."""
+
+    def make_source(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        make_user_data(self.root)
+        self.source = self.make_source()
+        self.source.watch([self.root])
+
+    def tearDown(self):
+        self.source.close()
+        self.tmp.cleanup()
+
+    def test_preferences_write_wakes_with_its_path(self):
+        timer = write_later(lambda: write_preferences(self.root, 'Profile 1', state=0))
+        changed = self.source.wait(5)
+        timer.join()
+        self.assertEqual(changed, {os.path.join(self.root, 'Profile 1', 'Preferences')})
+
+    def test_other_profile_files_do_not_wake(self):
+        def write_journal():
+            with open(os.path.join(self.root, 'Default', 'History-journal'), 'w') as f:
+                f.write('x')
+        timer = write_later(write_journal)
+        self.assertEqual(self.source.wait(0.6 + self.extra_wait), set())
+        timer.join()
+
+    def test_interrupt_ends_the_wait(self):
+        timer = write_later(self.source.interrupt)
+        self.assertEqual(self.source.wait(5), set())
+        timer.join()
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux-only")
+class InotifyChangeSourceTest(ChangeSourceContract, unittest.TestCase):
+    extra_wait = 0
+
+    def make_source(self):
+        return guardian.InotifyChangeSource()
+
+    def test_new_profile_directory_is_watched(self):
+        os.makedirs(os.path.join(self.root, 'Profile 2'))
+        self.assertEqual(self.source.wait(1), {self.root})
+        timer = write_later(lambda: write_preferences(self.root, 'Profile 2', state=1))
+        self.assertEqual(self.source.wait(5), {os.path.join(self.root, 'Profile 2', 'Preferences')})
+        timer.join()
+
+
+class PollingChangeSourceTest(ChangeSourceContract, unittest.TestCase):
+    extra_wait = 0.5
+
+    def make_source(self):
+        return guardian.PollingChangeSource(poll_interval=0.05)
+
+
+class WatchedProfileFileTest(unittest.TestCase):
+    def test_only_local_state_and_profile_preferences(self):
+        self.assertTrue(guardian._is_watched_profile_file('Local State'))
+        self.assertTrue(guardian._is_watched_profile_file('Profile 1\\Preferences'))
+        self.assertFalse(guardian._is_watched_profile_file('Default/History-journal'))
+        self.assertFalse(guardian._is_watched_profile_file('Default/Extensions/abc/Preferences'))
+
+
+class RescanAfterChangeTest(unittest.TestCase):
+    def test_only_the_changed_profile_is_read_again(self):
+        app = guardian.ExtensionGuardian.__new__(guardian.ExtensionGuardian)
+        app.prefs_cache = guardian.PreferencesCache()
+        app.local_state_profiles = guardian.LocalStateProfiles()
+        logger = logging.getLogger('guardian.test')
+        with tempfile.TemporaryDirectory() as root:
+            make_user_data(root)
+            app.scan_profiles_for_extensions(root, [EXT_ID], logger)
+            self.assertEqual(app.prefs_cache.stats()['misses'], 2)
+
+            write_preferences(root, 'Profile 1', state=0)
+            results = app.scan_profiles_for_extensions(root, [EXT_ID], logger)
+            self.assertEqual(app.prefs_cache.stats(), {'hits': 1, 'misses': 3, 'entries': 2})
+            self.assertEqual(sorted((s.profile, s.reason) for s in results[EXT_ID]),
+                             [('Default', guardian.ExtensionState.ENABLED),
+                              ('Profile 1', guardian.ExtensionState.DISABLED)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+class EventJournalTest(unittest.TestCase):
+    INDEX_EVERY = 4
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = guardian.EventJournal(self.tmp.name, index_every=self.INDEX_EVERY)
+        # Stay inside one local day so every event lands in the same segment
+        self.base = datetime.now().replace(hour=1, minute=0, second=0, microsecond=0).timestamp()
+        self.stamps = [self.base + i for i in range(20)]
+        for i, ts in enumerate(self.stamps):
+            self.journal.append('extension_enabled' if i % 2 else 'extension_disabled', ts=ts, n=i,
+                                browser='chrome.exe' if i % 3 else 'msedge.exe')
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def numbers(self, **query):
+        return [event['n'] for event in self.journal.query(**query)]
+
+    def test_since_and_until_at_index_block_boundaries(self):
+        for boundary in (0, 4, 8, 12, 16):
+            ts = self.stamps[boundary]
+            self.assertEqual(self.numbers(since=ts), list(range(boundary, 20)), boundary)
+            self.assertEqual(self.numbers(since=ts - 0.5), list(range(boundary, 20)), boundary)
+            self.assertEqual(self.numbers(since=ts + 0.5), list(range(boundary + 1, 20)), boundary)
+            self.assertEqual(self.numbers(until=ts), list(range(0, boundary + 1)), boundary)
+            self.assertEqual(self.numbers(since=ts, until=ts), [boundary], boundary)
+        self.assertEqual(self.numbers(since=self.stamps[3], until=self.stamps[5]), [3, 4, 5])
+
+    def test_equal_timestamps_across_index_blocks(self):
+        ts = self.stamps[-1] + 10
+        for i in range(20, 30):
+            self.journal.append('extension_missing', ts=ts, n=i)
+        self.assertEqual(self.numbers(since=ts), list(range(20, 30)))
+        self.assertEqual(self.numbers(since=ts, until=ts, kinds=['extension_missing']), list(range(20, 30)))
+
+    def test_filters_and_limit(self):
+        self.assertEqual(self.numbers(kinds=['extension_disabled'], browser='msedge.exe'), [0, 6, 12, 18])
+        self.assertEqual(self.numbers(kinds=['extension_enabled'], limit=2), [17, 19])
+        self.assertEqual(self.numbers(kinds=['incognito_revoked']), [])
+
+    def test_torn_final_line_is_skipped(self):
+        self.journal.close()
+        segment = next(Path(self.tmp.name).glob('events_*.jsonl'))
+        with open(segment, 'ab') as f:
+            f.write(b'{"ts":')
+        self.assertEqual(self.numbers(since=self.stamps[16]), [16, 17, 18, 19])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import importlib.util
+import os
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+ExtensionState = guardian.ExtensionState
+
+EXT_ID = 'cefohabdfmncmcilofdoodoaibcaakbc'
+RECORD = guardian.ProfileRecord('Profile 1', os.path.join('User Data', 'Profile 1'),
+                                os.path.join('User Data', 'Profile 1', 'Preferences'),
+                                os.stat_result((0o100644, 42, 0, 1, 0, 0, 1234, 0, 0, 0)), None)
+
+
+def classify(ext_data):
+    return ExtensionState.from_entry('chrome.exe', RECORD, EXT_ID, ext_data)
+
+
+class ExtensionStateFromEntryTest(unittest.TestCase):
+    def test_reason_codes(self):
+        cases = [
+            (None, ExtensionState.MISSING),
+            ({}, ExtensionState.MISSING),
+            ({'state': 1, 'incognito': True}, ExtensionState.ENABLED),
+            ({'state': 1, 'incognito': 'spanning'}, ExtensionState.ENABLED),
+            ({'state': 1, 'allow_in_incognito': True}, ExtensionState.ENABLED),
+            ({'state': 0, 'incognito': True, 'disable_reasons': [1]}, ExtensionState.DISABLED),
+            ({'state': 1, 'incognito': True, 'disable_reasons': [8192]}, ExtensionState.DISABLE_REASONS),
+            ({'state': 1, 'incognito': False}, ExtensionState.INCOGNITO_REVOKED),
+            ({'state': 1}, ExtensionState.INCOGNITO_REVOKED),
+        ]
+        for ext_data, reason in cases:
+            self.assertEqual(classify(ext_data).reason, reason, ext_data)
+
+    def test_disable_reasons_bit_mask_is_normalised(self):
+        ext_state = classify({'state': 1, 'incognito': True, 'disable_reasons': 2})
+        self.assertEqual(ext_state.reason, ExtensionState.DISABLE_REASONS)
+        self.assertEqual(ext_state.disable_reasons, (2,))
+
+    def test_record_fields_and_predicates(self):
+        ext_state = classify({'state': 0, 'incognito': True})
+        self.assertEqual((ext_state.browser, ext_state.profile, ext_state.extension_id, ext_state.state),
+                         ('chrome.exe', 'Profile 1', EXT_ID, 0))
+        self.assertEqual(ext_state.source_path, RECORD.prefs_path)
+        self.assertEqual(ext_state.signature, guardian._stat_signature(RECORD.prefs_stat))
+        self.assertTrue(ext_state.is_blocking)
+        self.assertFalse(ext_state.is_enabled or ext_state.is_error)
+        self.assertEqual(ext_state.describe(), "disabled in 'Profile 1'")
+        with self.assertRaises(AttributeError):
+            ext_state.extra = 1
+        # Same file signature and values: the states compare equal
+        self.assertEqual(ext_state, classify({'state': 0, 'incognito': True}))
+
+    def test_errors_are_neither_blocking_nor_enabled(self):
+        ext_state = ExtensionState.from_error('msedge.exe', RECORD, EXT_ID, ExtensionState.LOCKED)
+        self.assertTrue(ext_state.is_error)
+        self.assertFalse(ext_state.is_blocking or ext_state.is_enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+EXT_ID = 'cefohabdfmncmcilofdoodoaibcaakbc'
+OTHER_IDS = ['aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', 'bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb',
+             'cccccccccccccccccccccccccccccccc', 'dddddddddddddddddddddddddddddddd',
+             'eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee']
+ENTRY = {'state': 1, 'incognito': True, 'disable_reasons': [], 'location': 4}
+
+
+class ExtractManyExtensionEntriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'Preferences')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, prefs, indent=None):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(prefs, f, indent=indent, ensure_ascii=False)
+
+    def extract(self, ids):
+        """extract_extension_entries, reporting how many times it fell back to a full json.load."""
+        with mock.patch.object(guardian, '_load_extension_entries', wraps=guardian._load_extension_entries) as load:
+            result = guardian.extract_extension_entries(self.path, ids)
+        return result, load.call_count
+
+    def test_batch_pass_matches_per_id_lookup(self):
+        ids = [EXT_ID] + OTHER_IDS
+        settings = {ext_id: dict(ENTRY, path=ext_id) for ext_id in ids[1::2]}
+        self.write({'extensions': {'settings': settings, 'pinned_extensions': ids}}, indent=2)
+        self.assertGreater(len(ids), guardian._PER_ID_FIND_MAX)
+        expected = {ext_id: settings.get(ext_id) for ext_id in ids}
+        self.assertEqual(self.extract(ids), (expected, 0))
+        for ext_id in ids:
+            self.assertEqual(self.extract([ext_id]), ({ext_id: expected[ext_id]}, 0))
+
+    def test_one_ambiguous_id_parses_the_file_once_for_all(self):
+        ids = [EXT_ID] + OTHER_IDS
+        self.write({
+            'backup': {EXT_ID: {'state': 1}},
+            'extensions': {'settings': {EXT_ID: {'state': 0}, OTHER_IDS[0]: ENTRY}},
+        })
+        result, loads = self.extract(ids)
+        self.assertEqual(loads, 1)
+        self.assertEqual(result[EXT_ID], {'state': 0})
+        self.assertEqual(result[OTHER_IDS[0]], ENTRY)
+
+
+if __name__ == '__main__':
+    unittest.main()
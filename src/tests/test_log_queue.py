@@ -0,0 +1,46 @@
+import importlib.util
+import logging
+import os
+import queue
+import sys
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+def make_record(msg, *args, level=logging.INFO, exc_info=None):
+    return logging.LogRecord('guardian', level, __file__, 1, msg, args, exc_info)
+
+
+class DroppingQueueHandlerTest(unittest.TestCase):
+    def test_queued_copy_leaves_the_callers_record_alone(self):
+        handler = guardian.DroppingQueueHandler(queue.Queue())
+        try:
+            raise ValueError("bad Preferences")
+        except ValueError:
+            exc_info = sys.exc_info()
+        record = make_record('scan failed for %s', 'chrome.exe', level=logging.ERROR, exc_info=exc_info)
+        handler.handle(record)
+        queued = handler.queue.get_nowait()
+
+        self.assertIsNot(queued, record)
+        self.assertEqual((queued.msg, queued.args, queued.exc_info), ('scan failed for chrome.exe', None, None))
+        self.assertIn('ValueError: bad Preferences', queued.exc_text)
+        # Other handlers still format the original record on the calling thread
+        self.assertEqual((record.msg, record.args, record.exc_info), ('scan failed for %s', ('chrome.exe',), exc_info))
+
+    def test_full_queue_drops_info_and_evicts_for_warnings(self):
+        handler = guardian.DroppingQueueHandler(queue.Queue(maxsize=2))
+        for msg in ('first', 'second', 'dropped'):
+            handler.handle(make_record(msg))
+        handler.handle(make_record('warning', level=logging.WARNING))
+        queued = [handler.queue.get_nowait().msg for _ in range(handler.queue.qsize())]
+        self.assertEqual(queued, ['second', 'warning'])
+        self.assertEqual(handler.dropped, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
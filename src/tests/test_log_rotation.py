@@ -0,0 +1,89 @@
+import importlib.util
+import logging
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+def make_record(msg):
+    return logging.LogRecord('guardian', logging.WARNING, __file__, 1, msg, (), None)
+
+
+class RecordingArchiver:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, path=None):
+        self.submitted.append(Path(path) if path is not None else None)
+
+
+class DailyRotatingFileHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archiver = RecordingArchiver()
+        self.handler = guardian.DailyRotatingFileHandler(self.tmp.name, max_bytes=100, archiver=self.archiver)
+        self.handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def tearDown(self):
+        self.handler.close()
+        self.tmp.cleanup()
+
+    def test_rolls_over_when_full(self):
+        today = Path(self.handler.baseFilename)
+        # The size check runs before each write, so every line after a full file starts a new one
+        for i in range(3):
+            self.handler.handle(make_record(str(i) * 120))
+        rotated = [today.with_name(f"{today.stem}.1.log"), today.with_name(f"{today.stem}.2.log")]
+        self.assertEqual(self.archiver.submitted, rotated)
+        self.assertTrue(all(path.exists() for path in rotated))
+        self.assertEqual(Path(self.handler.baseFilename), today)
+        self.assertEqual(rotated[0].read_text(encoding='utf-8'), '0' * 120 + '\n')
+        self.assertEqual(today.read_text(encoding='utf-8'), '2' * 120 + '\n')
+
+    def test_rolls_over_at_midnight(self):
+        # Pretend the handler was opened yesterday
+        self.handler.close()
+        self.handler._set_day(datetime.now() - timedelta(days=1))
+        yesterday = self.handler._path_for_day()
+        self.handler.baseFilename = os.path.abspath(yesterday)
+        self.handler.stream = self.handler._open()
+        self.handler.handle(make_record('after midnight'))
+        self.assertEqual(self.archiver.submitted, [yesterday])
+        self.assertEqual(Path(self.handler.baseFilename).name, f"guardian_{datetime.now():%Y%m%d}.log")
+        self.assertEqual(Path(self.handler.baseFilename).read_text(encoding='utf-8'), 'after midnight\n')
+
+
+class SaveLogSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        app = guardian.ExtensionGuardian.__new__(guardian.ExtensionGuardian)
+        app.logger = logging.getLogger('guardian.test')
+        app.log_dir = Path(self.tmp.name)
+        app.recent_log_handler = guardian.RingBufferLogHandler(max_lines=10, max_bytes=10_000)
+        app.recent_log_handler.setFormatter(logging.Formatter('%(message)s'))
+        app.recent_log_handler.handle(make_record('extension disabled'))
+        app.journal = guardian.EventJournal(app.log_dir / "journal")
+        app.log_archiver = RecordingArchiver()
+        self.app = app
+
+    def tearDown(self):
+        self.app.journal.close()
+        self.tmp.cleanup()
+
+    def test_reported_path_is_the_file_left_on_disk(self):
+        path = self.app.save_log_snapshot("manual")
+        self.assertEqual(path.suffix, '.log')
+        self.assertEqual(path.read_text(encoding='utf-8'), 'extension disabled')
+        # Retention runs, but the snapshot itself is not queued for compression
+        self.assertEqual(self.app.log_archiver.submitted, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
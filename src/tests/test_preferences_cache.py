@@ -0,0 +1,37 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+EXT_ID = 'cefohabdfmncmcilofdoodoaibcaakbc'
+OTHER_ID = 'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa'
+ENTRY = {'state': 1, 'incognito': True, 'disable_reasons': [], 'location': 4}
+
+
+class PreferencesCacheTest(unittest.TestCase):
+    def test_reads_once_per_signature(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'Preferences')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'extensions': {'settings': {EXT_ID: ENTRY}}}, f)
+            cache = guardian.PreferencesCache()
+            self.assertEqual(cache.get_extension_entries(path, [EXT_ID, OTHER_ID]),
+                             {EXT_ID: ENTRY, OTHER_ID: None})
+            self.assertEqual(cache.get_extension_entries(path, [OTHER_ID, EXT_ID]),
+                             {EXT_ID: ENTRY, OTHER_ID: None})
+            self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'entries': 1})
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'extensions': {'settings': {EXT_ID: {'state': 0}}}}, f, indent=1)
+            self.assertEqual(cache.get_extension_entries(path, [EXT_ID]), {EXT_ID: {'state': 0}})
+            self.assertEqual(cache.stats()['misses'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
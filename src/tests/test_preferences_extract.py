@@ -0,0 +1,81 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+EXT_ID = 'cefohabdfmncmcilofdoodoaibcaakbc'
+OTHER_IDS = ['aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', 'bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb',
+             'cccccccccccccccccccccccccccccccc', 'dddddddddddddddddddddddddddddddd',
+             'eeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee']
+ENTRY = {'state': 1, 'incognito': True, 'disable_reasons': [], 'location': 4}
+
+
+class ExtractExtensionEntriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'Preferences')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, prefs, indent=None):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(prefs, f, indent=indent, ensure_ascii=False)
+
+    def extract(self, ids):
+        """extract_extension_entries, reporting how many times it fell back to a full json.load."""
+        with mock.patch.object(guardian, '_load_extension_entries', wraps=guardian._load_extension_entries) as load:
+            result = guardian.extract_extension_entries(self.path, ids)
+        return result, load.call_count
+
+    def test_entry_found_without_full_parse(self):
+        self.write({'extensions': {'settings': {EXT_ID: ENTRY}}}, indent=3)
+        self.assertEqual(self.extract([EXT_ID]), ({EXT_ID: ENTRY}, 0))
+
+    def test_absent_id(self):
+        self.write({'extensions': {'settings': {OTHER_IDS[0]: ENTRY}}})
+        self.assertEqual(self.extract([EXT_ID]), ({EXT_ID: None}, 0))
+
+    def test_id_only_under_protection_macs(self):
+        self.write({
+            'extensions': {'settings': {}, 'pinned_extensions': [EXT_ID]},
+            'protection': {'macs': {'extensions': {'settings': {EXT_ID: 'A1B2C3'}}}},
+        })
+        self.assertEqual(self.extract([EXT_ID]), ({EXT_ID: None}, 0))
+
+    def test_id_only_under_updateclientdata(self):
+        # An object without settings keys is not trusted as the entry, so the file is parsed in full
+        self.write({'updateclientdata': {'apps': {EXT_ID: {'cohort': '1::', 'cohortname': ''}}},
+                    'extensions': {'settings': {}}})
+        self.assertEqual(self.extract([EXT_ID]), ({EXT_ID: None}, 1))
+
+    def test_two_candidates_fall_back_to_full_parse(self):
+        self.write({
+            'backup': {EXT_ID: {'state': 1, 'incognito': True}},
+            'extensions': {'settings': {EXT_ID: {'state': 0, 'disable_reasons': [1]}}},
+        })
+        self.assertEqual(self.extract([EXT_ID]), ({EXT_ID: {'state': 0, 'disable_reasons': [1]}}, 1))
+
+    def test_non_ascii_before_and_inside_entry(self):
+        entry = dict(ENTRY, manifest={'name': 'Gardien d\'extension — 拡張機能', 'description': 'é' * 100000})
+        self.write({
+            'browser': {'history': ['日本語のページ タイトル ü' * 40 for _ in range(500)]},
+            'extensions': {'settings': {EXT_ID: entry}},
+        })
+        self.assertEqual(self.extract([EXT_ID]), ({EXT_ID: entry}, 0))
+
+    def test_empty_file_is_an_error(self):
+        open(self.path, 'wb').close()
+        with self.assertRaises(ValueError):
+            guardian.extract_extension_entries(self.path, [EXT_ID])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+psutil = guardian.psutil
+
+
+@unittest.skipIf(os.name == 'nt', "needs a POSIX shell")
+class TerminateProcessTreesTest(unittest.TestCase):
+    def setUp(self):
+        # A 'browser' that started one helper of its own image and one unrelated program
+        script = ("import subprocess, sys, time\n"
+                  "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+                  "subprocess.Popen(['sleep', '60'])\n"
+                  "time.sleep(60)\n")
+        self.root = subprocess.Popen([sys.executable, '-c', script])
+        self.root_proc = psutil.Process(self.root.pid)
+        deadline = time.monotonic() + 5
+        while len(self.root_proc.children()) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        children = self.root_proc.children()
+        self.assertEqual(len(children), 2)
+        self.helper = next(c for c in children if c.name() != 'sleep')
+        self.unrelated = next(c for c in children if c.name() == 'sleep')
+
+    def tearDown(self):
+        for proc in (self.unrelated, self.helper, self.root_proc):
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        self.root.wait()
+        psutil.wait_procs([self.unrelated, self.helper], timeout=1)
+
+    def test_only_listed_processes_are_signalled(self):
+        reports = guardian.terminate_process_trees([self.root_proc, self.helper], timeout=2)
+        self.root.wait(timeout=2)
+        self.assertEqual(reports, [dict(reports[0], root=self.root.pid, processes=2, gone=2, killed=0)])
+        self.assertFalse(self.helper.is_running() and self.helper.status() != psutil.STATUS_ZOMBIE)
+        self.assertTrue(self.unrelated.is_running())
+        self.assertNotEqual(self.unrelated.status(), psutil.STATUS_ZOMBIE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import importlib.util
+import os
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+class FakeProvider:
+    """Process table held in a dict; counts how many PIDs the tracker asked it to resolve."""
+
+    def __init__(self, names):
+        self.names = dict(names)
+        self.resolved = 0
+
+    def pids(self):
+        return list(self.names)
+
+    def resolve(self, pid, exe_for_images):
+        self.resolved += 1
+        name = self.names.get(pid)
+        if name is None:
+            return None
+        exe = f"C:\\Browsers\\{name}" if name in exe_for_images else None
+        return guardian.TrackedProcess(pid, 1000.0 + pid, name, exe)
+
+
+class ProcessTrackerEventsTest(unittest.TestCase):
+    def setUp(self):
+        self.provider = FakeProvider({1: 'System', 2: 'explorer.exe'})
+        self.events = []
+        self.tracker = guardian.ProcessTracker({'chrome.exe', 'msedge.exe'}, provider=self.provider,
+                                               on_event=self.events.append)
+        self.tracker.refresh()
+        self.provider.resolved = 0
+
+    def test_started_and_exited_once_per_image(self):
+        self.provider.names.update({10: 'chrome.exe', 11: 'chrome.exe'})
+        self.assertEqual([tuple(e) for e in self.tracker.refresh()], [('started', 'chrome.exe', [10, 11])])
+        # Another process of a running browser is not a new start
+        self.provider.names[12] = 'chrome.exe'
+        self.assertEqual(self.tracker.refresh(), [])
+        del self.provider.names[10], self.provider.names[11]
+        self.assertEqual(self.tracker.refresh(), [])
+        del self.provider.names[12]
+        self.assertEqual([tuple(e) for e in self.tracker.refresh()], [('exited', 'chrome.exe', [12])])
+        self.assertEqual([e.kind for e in self.events], ['started', 'exited'])
+
+    def test_only_new_pids_are_resolved(self):
+        self.provider.names.update({20: 'msedge.exe', 21: 'notepad.exe'})
+        self.tracker.refresh()
+        self.tracker.refresh()
+        self.assertEqual(self.provider.resolved, 2)
+        self.assertEqual(len(self.tracker), 4)
+
+    def test_snapshot_holds_only_watched_images_with_exe(self):
+        self.provider.names.update({30: 'chrome.exe', 31: 'notepad.exe'})
+        self.tracker.refresh()
+        snapshot = self.tracker.snapshot()
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual([(p['pid'], p['exe']) for p in snapshot.group({'chrome.exe'})['chrome.exe']],
+                         [(30, 'C:\\Browsers\\chrome.exe')])
+
+    def test_process_gone_before_resolve_is_skipped(self):
+        provider = FakeProvider({40: 'chrome.exe'})
+        provider.pids = lambda: [40, 41]  # 41 exits between the listing and resolve()
+        tracker = guardian.ProcessTracker({'chrome.exe'}, provider=provider)
+        self.assertEqual([tuple(e) for e in tracker.refresh()], [('started', 'chrome.exe', [40])])
+        self.assertEqual(len(tracker), 1)
+
+
+class ProcessTrackerResyncTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.provider = FakeProvider({pid: 'svchost.exe' for pid in range(1, 1001)})
+        self.scheduler = guardian.AdaptiveScheduler(base_interval=5, max_interval=60)
+        self.tracker = guardian.ProcessTracker({'chrome.exe'}, provider=self.provider,
+                                               resync_after=self.scheduler.idle_gap(), clock=lambda: self.now)
+
+    def cycle(self, active):
+        self.tracker.refresh()
+        self.now += self.scheduler.next_interval(active) + 0.2  # the cycle itself takes a moment
+
+    def test_active_polling_at_the_longest_interval_does_not_resync(self):
+        for _ in range(10):
+            self.cycle(active=True)
+        self.assertEqual(self.provider.resolved, 1000)
+        self.assertEqual(self.tracker.resync_count, 0)
+
+    def test_refresh_after_an_idle_back_off_resolves_every_pid(self):
+        self.cycle(active=True)
+        self.cycle(active=False)
+        self.tracker.refresh()
+        self.assertEqual(self.tracker.resync_count, 1)
+        self.assertEqual(self.provider.resolved, 2000)
+
+    def test_recycled_pid_is_seen_after_resync(self):
+        self.tracker.refresh()
+        self.provider.names[7] = 'chrome.exe'
+        self.now += self.scheduler.idle_gap() + 1
+        events = self.tracker.refresh()
+        self.assertEqual([tuple(e) for e in events], [('started', 'chrome.exe', [7])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+class ProfileDiscoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        # 'System Profile' has a Preferences file but is not a user profile listed in Local State
+        for parts in (('Default',), ('Profile 1',), ('System Profile',), ('Snapshots', '120.0', 'Default')):
+            directory = os.path.join(self.root, *parts)
+            os.makedirs(directory)
+            with open(os.path.join(directory, 'Preferences'), 'w', encoding='utf-8') as f:
+                f.write('{}')
+        os.makedirs(os.path.join(self.root, 'Crashpad'))
+        self.local_state = guardian.LocalStateProfiles()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_local_state(self, content):
+        with open(os.path.join(self.root, 'Local State'), 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+
+    def profiles(self):
+        records = guardian.iter_profile_records(self.root, self.local_state)
+        return sorted((r.name, r.snapshot_version or '') for r in records)
+
+    def test_profiles_come_from_local_state(self):
+        self.write_local_state({'profile': {'info_cache': {'Default': {}, 'Profile 1': {}, 'Profile 9': {}}}})
+        # Profile 9 is listed but has no directory; snapshots are still included
+        self.assertEqual(self.profiles(), [('Default', ''), ('Default', '120.0'), ('Profile 1', '')])
+
+    def test_falls_back_to_probing_directories(self):
+        expected = [('Default', ''), ('Default', '120.0'), ('Profile 1', ''), ('System Profile', '')]
+        self.assertEqual(self.profiles(), expected)  # No Local State
+        for unusable in ('{"profile": ', {'profile': {}}, {'profile': {'info_cache': {}}}, []):
+            self.write_local_state(unusable)
+            self.assertIsNone(self.local_state.get_profile_names(self.root), unusable)
+            self.assertEqual(self.profiles(), expected, unusable)
+
+    def test_rewritten_local_state_is_read_again(self):
+        self.write_local_state({'profile': {'info_cache': {'Default': {}}}})
+        self.assertEqual(self.local_state.get_profile_names(self.root), ['Default'])
+        self.write_local_state({'profile': {'info_cache': {'Default': {}, 'Profile 1': {}}}})
+        self.assertEqual(self.local_state.get_profile_names(self.root), ['Default', 'Profile 1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
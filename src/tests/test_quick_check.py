@@ -0,0 +1,38 @@
+import importlib.util
+import logging
+import os
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+class StoppingEngine:
+    """Reports itself running, then refuses the submit() as an engine stopping meanwhile does."""
+
+    is_running = True
+
+    def submit(self, coro):
+        coro.close()
+        raise RuntimeError("monitoring engine is not running")
+
+
+class QuickCheckSchedulingTest(unittest.TestCase):
+    def test_failed_submit_re_enables_the_button(self):
+        app = guardian.ExtensionGuardian.__new__(guardian.ExtensionGuardian)
+        app.logger = logging.getLogger('guardian.test')
+        app.logger.disabled = True
+        app.ui = guardian.UiUpdateChannel()
+        app.quick_check_running = False
+        app.monitoring_engine = StoppingEngine()
+
+        app.quick_check_all_browsers()
+        self.assertFalse(app.quick_check_running)
+        values, _, _ = app.ui.drain()
+        self.assertEqual(values['check_result'], "Check failed: monitoring engine is not running")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import importlib.util
+import logging
+import os
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord('guardian', logging.WARNING, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class RepeatSuppressionFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.summaries = []
+        self.filter = guardian.RepeatSuppressionFilter(self.summaries.append, window=10, max_window=40,
+                                                       clock=lambda: self.now)
+
+    def passes(self, record):
+        return self.filter.filter(record)
+
+    def test_repeats_collapse_into_one_summary(self):
+        self.assertTrue(self.passes(make_record('disabled in %s', 'chrome.exe')))
+        for _ in range(5):
+            self.now += 1
+            self.assertFalse(self.passes(make_record('disabled in %s', 'chrome.exe')))
+        self.assertTrue(self.passes(make_record('disabled in %s', 'msedge.exe')))
+        self.now += 10
+        self.passes(make_record('unrelated'))
+        self.assertEqual([s.getMessage() for s in self.summaries],
+                         ['[REPEATED x5 in 15s] disabled in chrome.exe'])
+        self.assertEqual(self.filter.suppressed_total, 5)
+
+    def test_window_doubles_while_recurring_and_resets_after_silence(self):
+        self.passes(make_record('tick'))
+        for _ in range(12):
+            self.now += 1
+            self.passes(make_record('tick'))
+        # First window ended with recent repeats: it doubles to 20s instead of letting 'tick' through
+        self.assertFalse(self.passes(make_record('tick')))
+        self.assertEqual(len(self.summaries), 1)
+        self.now += 100
+        self.passes(make_record('other'))
+        self.assertEqual(len(self.summaries), 2)
+        self.now += 100
+        self.passes(make_record('other'))
+        self.assertTrue(self.passes(make_record('tick')))
+
+    def test_repeat_key_groups_changing_arguments(self):
+        self.assertTrue(self.passes(make_record('count %d', 1, repeat_key='counter')))
+        self.assertFalse(self.passes(make_record('count %d', 2, repeat_key='counter')))
+        self.filter.flush()
+        self.assertEqual([s.getMessage() for s in self.summaries], ['[REPEATED x1 in 0s] count 2'])
+        self.assertTrue(self.summaries[0].repeat_summary)
+        self.assertTrue(self.passes(self.summaries[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
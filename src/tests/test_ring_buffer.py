@@ -0,0 +1,65 @@
+import importlib.util
+import logging
+import os
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+
+def make_record(msg):
+    return logging.LogRecord('guardian', logging.WARNING, __file__, 1, msg, (), None)
+
+
+class RingBufferLogHandlerTest(unittest.TestCase):
+    def make_handler(self, max_lines, max_bytes):
+        handler = guardian.RingBufferLogHandler(max_lines=max_lines, max_bytes=max_bytes)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+    def test_empty(self):
+        handler = self.make_handler(10, 1000)
+        self.assertEqual(handler.get_latest_line_index(), -1)
+        self.assertEqual(handler.get_all_lines(), [])
+
+    def test_evicts_by_line_count(self):
+        handler = self.make_handler(3, 10_000)
+        for i in range(5):
+            handler.handle(make_record(f"line {i}"))
+        self.assertEqual(handler.get_all_lines(), ['line 2', 'line 3', 'line 4'])
+        self.assertEqual(handler.get_latest_line_index(), 4)
+        self.assertEqual(handler.get_lines_since(0), ['line 2', 'line 3', 'line 4'])
+        self.assertEqual(handler.get_lines_since(4), ['line 4'])
+        self.assertEqual(handler.get_lines_since(5), [])
+
+    def test_evicts_by_bytes(self):
+        handler = self.make_handler(100, 25)
+        for i in range(4):
+            handler.handle(make_record(f"{i}" * 10))
+        # Three 10-byte lines would exceed 25 bytes
+        self.assertEqual(handler.get_all_lines(), ['2' * 10, '3' * 10])
+        # Sizes are counted in UTF-8 bytes, not characters
+        handler.handle(make_record('é' * 10))
+        self.assertEqual(handler.get_all_lines(), ['é' * 10])
+
+    def test_line_larger_than_budget_is_kept_alone(self):
+        handler = self.make_handler(10, 5)
+        handler.handle(make_record('short'))
+        handler.handle(make_record('much longer than five bytes'))
+        self.assertEqual(handler.get_all_lines(), ['much longer than five bytes'])
+
+    def test_configure_keeps_newest_lines(self):
+        handler = self.make_handler(10, 10_000)
+        for i in range(6):
+            handler.handle(make_record(f"line {i}"))
+        handler.configure(2, 10_000)
+        self.assertEqual(handler.get_all_lines(), ['line 4', 'line 5'])
+        handler.handle(make_record('line 6'))
+        self.assertEqual(handler.get_all_lines(), ['line 5', 'line 6'])
+        self.assertEqual(handler.get_latest_line_index(), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extension-guardian-desktop.py")
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", MODULE_PATH)
+guardian = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(guardian)
+
+CHILD = r"""
+import sys, importlib.util
+spec = importlib.util.spec_from_file_location("extension_guardian_desktop", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+app = module.ExtensionGuardian()
+print('tkinter' in sys.modules, app.root is None)
+app.stop_monitoring()
+"""
+
+
+class StartupTest(unittest.TestCase):
+    def test_background_start_does_not_load_tkinter(self):
+        with tempfile.TemporaryDirectory() as home:
+            env = dict(os.environ, HOME=home, USERPROFILE=home)
+            child = subprocess.run([sys.executable, '-c', CHILD, MODULE_PATH],
+                                   env=env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(child.stdout.split(), ['False', 'True'], child.stderr)
+
+    def test_window_is_built_on_first_show(self):
+        app = guardian.ExtensionGuardian.__new__(guardian.ExtensionGuardian)
+        app.ui = guardian.UiUpdateChannel()
+        app.show_requested = threading.Event()
+        calls = []
+        mainloop_entered = threading.Event()
+
+        class FakeRoot:
+            def mainloop(self):
+                calls.append('mainloop')
+                mainloop_entered.set()
+
+        def setup_gui():
+            calls.append('setup_gui')
+            app.root = FakeRoot()
+
+        app.create_system_tray = lambda: calls.append('tray')
+        app.start_monitoring = lambda: calls.append('monitor')
+        app.setup_gui = setup_gui
+        runner = threading.Thread(target=app.run, daemon=True)
+        runner.start()
+        self.assertFalse(mainloop_entered.wait(0.2))
+        self.assertEqual(calls, ['tray', 'monitor'])
+
+        app.show_window()
+        self.assertTrue(mainloop_entered.wait(5))
+        runner.join(5)
+        self.assertEqual(calls, ['tray', 'monitor', 'setup_gui', 'mainloop'])
+        self.assertTrue(app.ui.drain()[0]['show_window'])
+
+
+if __name__ == '__main__':
+    unittest.main()